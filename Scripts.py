@@ -18,7 +18,8 @@ class FtKrshna:
         "  - Choose a channel (e.g., My Channel)\n"
         "  - Send: `Check out our new product!`\n"
         "  - Add buttons: `Learn More - https://example.com`\n"
-        "  - Confirm to post.\n\n"
+        "  - Confirm to post.\n"
+        "• Tip: With many channels, tap `🔍 Search channels` and type part of a channel name (enable inline mode in @BotFather).\n\n"
 
         "*/edit*\n"
         "Edit an existing post in a channel.\n"
@@ -39,13 +40,35 @@ class FtKrshna:
         "  - Type `/broadcast`\n"
         "  - Send: `Join our event today!`\n"
         "  - Add buttons: `RSVP - https://event.com`\n"
-        "  - Confirm to send to all channels.\n\n"
+        "  - Confirm to send to all channels.\n"
+        "• Tip: If your channels have tags, tap tags before confirming to send only to those channels.\n"
+        "• Tip: Channels that keep failing are quarantined and skipped; see *My Channels → Quarantined*.\n\n"
+
+        "*/editbroadcast*\n"
+        "Edit a past broadcast in every channel at once.\n"
+        "• Steps: Pick a recent broadcast, send new content or `keep`, send new buttons or `keep`, preview, and confirm.\n"
+        "• Example:\n"
+        "  - Type `/editbroadcast`\n"
+        "  - Choose the broadcast to fix\n"
+        "  - Send: `Join our event tomorrow!`\n"
+        "  - Send: `keep` to retain the buttons\n"
+        "  - Confirm to update every channel copy.\n\n"
+
+        "*/retractbroadcast*\n"
+        "Delete a past broadcast from every channel at once.\n"
+        "• Steps: Pick a recent broadcast and confirm.\n"
+        "• You get a report of any copies that could not be removed.\n\n"
 
         "*/add*\n"
         "Add a channel to the bot’s database for posting.\n"
         "• Format: `/add -100xxxxxxxxxx` (channel ID starts with -100)\n"
         "• Example: `/add -100123456789` adds a channel named 'My Channel'.\n"
-        "• You can Unlimited Channels\n\n"
+        "• You can Unlimited Channels\n"
+        "• Bulk: `/add -100111 -100222 -100333` or send a .txt/.csv file of IDs with `/add` as caption.\n\n"
+
+        "*/tag* and */untag*\n"
+        "Group channels with tags for targeted broadcasts.\n"
+        "• Format: `/tag -100xxxxxxxxxx news asia` or `/untag -100xxxxxxxxxx asia`\n\n"
 
         "*/setdefaultbtns*\n"
         "Set default buttons to automatically add to posts.\n"
@@ -119,7 +142,8 @@ class FtKrshna:
         "• Popup button:\n"
         "`Button text - popup: Text of the popup`\n\n"
         "• Alert button:\n"
-        "`Button text - alert: Text of the popup`\n\n"
+        "`Button text - alert: Text of the popup`\n"
+        "Popup and alert texts can be up to 200 characters.\n\n"
         "• Share button:\n"
         "`Button text - share: Text to share`\n\n"
         "Send `none` to clear default buttons."
@@ -136,6 +160,8 @@ class Labels:
     POST = "Post"
     EDIT = "Edit"
     BROADCAST = "Broadcast"
+    EDIT_BROADCAST = "Edit Broadcast"
+    RETRACT_BROADCAST = "Retract Broadcast"
     HELP = "Help"
     DEFAULT_BUTTONS = "Default Buttons"
     MY_CHANNELS = "My Channels"
@@ -0,0 +1,28 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+"""Time compile_buttons on a typical 8-button layout, uncached (cold) and memoized (warm).
+
+Run from the repository root: python -m benchmarks.bench_buttons
+"""
+
+import timeit
+from bot.krshnaa.buttons import compile_buttons
+
+BUTTON_TEXT = "\n".join([
+    "Website - https://example.com && Channel - https://t.me/example",
+    "Info - popup: Posted every day at 9 AM && Rules - alert: No spam, no ads",
+    "Share - share: Check this out && Support - https://t.me/example_support",
+    "Mirror - https://mirror.example.com && FAQ - popup: Read the pinned message first"
+])
+
+def main(number: int = 20_000):
+    cold = min(timeit.repeat(lambda: compile_buttons.__wrapped__(BUTTON_TEXT), number=number, repeat=5))
+    compile_buttons(BUTTON_TEXT)
+    warm = min(timeit.repeat(lambda: compile_buttons(BUTTON_TEXT), number=number * 10, repeat=5))
+    print(f"cold: {cold / number * 1e6:.2f} µs per call")
+    print(f"warm: {warm / (number * 10) * 1e6:.3f} µs per call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+"""Time CallbackRouter.resolve for the callbacks the bot's keyboards emit.
+
+Run from the repository root: python -m benchmarks.bench_router
+"""
+
+import timeit
+from bot.krshnaa.handlers import build_callback_router, PostState
+from bot.krshnaa.broadcaster import BroadcastState
+
+CASES = [
+    ("start_post", None),
+    ("view_channel:-1001234567890", None),
+    ("chpage:sel:a:-1001234567890", PostState.WaitingForChannel.state),
+    ("select_channel:-1001234567890", PostState.WaitingForChannel.state),
+    ("confirm_post", BroadcastState.WaitingForPreview.state),
+    ("cancel_action", PostState.WaitingForMessage.state),
+    ("pp:AbCdEfGhIjKl", None),
+    ("no_such_action", None)
+]
+
+def main(number: int = 200_000):
+    router = build_callback_router()
+    for data, state in CASES:
+        seconds = min(timeit.repeat(lambda: router.resolve(data, state), number=number, repeat=5))
+        print(f"{data:<34} {str(state):<34} {seconds / number * 1e9:8.0f} ns")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+"""Measure the memory held by one FSM session with tracemalloc: a photo post with 8 buttons, kept as the
+plain dict MemoryStorage stores versus the compact Session that MongoFSMStorage caches.
+
+Run from the repository root: python -m benchmarks.measure_session
+"""
+
+import copy
+import gc
+import tracemalloc
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from bot.modules.session import Session
+
+SESSIONS = 1000
+
+def session_data(index: int) -> dict:
+    keyboard = InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(f"Website {index}", url=f"https://example.com/{index}"),
+         InlineKeyboardButton("Channel", url="https://t.me/example")],
+        [InlineKeyboardButton("Info", callback_data=f"pp:{index:012d}"),
+         InlineKeyboardButton("Rules", callback_data=f"pa:{index:012d}")],
+        [InlineKeyboardButton("Share", switch_inline_query="Check this out"),
+         InlineKeyboardButton("Support", url="https://t.me/example_support")],
+        [InlineKeyboardButton("Mirror", url="https://mirror.example.com"),
+         InlineKeyboardButton("FAQ", url=f"https://example.com/faq/{index}")]
+    ])
+    return {
+        "user_id": 100000 + index,
+        "flow": "post",
+        "channel_id": -1001000000000 - index,
+        "preview_message_id": 5000 + index,
+        "content": {
+            "type": "photo",
+            "file_id": f"AgACAgIAAxkBAAI{index:08d}ZmFrZV9maWxlX2lkX2Zvcl9tZWFzdXJpbmc",
+            "caption": f"Daily update #{index}",
+            "source": {"chat_id": -1002000000000, "message_id": 7000 + index}
+        },
+        "reply_markup": keyboard
+    }
+
+def measure(build) -> float:
+    """Average bytes still allocated per session after building SESSIONS of them."""
+    inputs = [session_data(i) for i in range(SESSIONS)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [build(data) for data in inputs]
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return total / SESSIONS
+
+def main():
+    as_dict = measure(copy.deepcopy)
+    as_session = measure(Session.from_data)
+    print(f"dict:    {as_dict / 1024:.2f} KB per session")
+    print(f"Session: {as_session / 1024:.2f} KB per session")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
 import logging
-from aiogram import Bot, Dispatcher
-from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram import Dispatcher
 from config import BOT_TOKEN
+from .helpers.ratelimit import RateLimitedBot
+from .helpers.lanes import UserLaneMiddleware
+from .modules.fsm_storage import MongoFSMStorage
 from .krshnaa.handlers import register_handlers
 
 logger = logging.getLogger(__name__)
 
-bot = Bot(token=BOT_TOKEN)
-storage = MemoryStorage()
+bot = RateLimitedBot(token=BOT_TOKEN)
+storage = MongoFSMStorage()
 dp = Dispatcher(bot, storage=storage)
+dp.middleware.setup(UserLaneMiddleware())
 
 __all__ = ["bot", "dp", "register_handlers"]
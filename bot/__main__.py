@@ -5,6 +5,10 @@
 import asyncio
 from . import bot, dp, register_handlers
 from .logger import setup_logger
+from .krshnaa.broadcaster import resume_broadcast_jobs
+from .krshnaa.health import channel_health_loop, quarantine_probe_loop
+from .modules import mongo_db, post_ledger, channel_registry, popup_store
+from config import CHANNEL_CHANGE_STREAM
 
 logger = setup_logger("FTKrshna")
 
@@ -15,10 +19,23 @@ async def main():
     me = await bot.get_me()
     logger.info(f"Bot username: @{me.username} | ID: {me.id} | Name: {me.first_name}")
 
+    health_task = None
+    probe_task = None
     try:
         logger.info("Registering handlers...")
         register_handlers(dp)
 
+        await mongo_db.ensure_indexes()
+        dp.storage.start_sweeper()
+        await channel_registry.load()
+        if CHANNEL_CHANGE_STREAM:
+            channel_registry.start_watching()
+        resumed = await resume_broadcast_jobs(bot)
+        if resumed:
+            logger.info(f"Resumed {resumed} unfinished broadcast job(s)")
+        health_task = asyncio.create_task(channel_health_loop(bot))
+        probe_task = asyncio.create_task(quarantine_probe_loop(bot))
+
         logger.info("Bot Started Successfully...")
         await dp.start_polling()
     except Exception as e:
@@ -26,6 +43,13 @@ async def main():
         raise
     finally:
         logger.info("Shutting down...")
+        if health_task:
+            health_task.cancel()
+        if probe_task:
+            probe_task.cancel()
+        channel_registry.stop_watching()
+        await post_ledger.flush()
+        await popup_store.flush()
         await dp.storage.close()
         await dp.storage.wait_closed()
         await bot.close()
@@ -1,4 +1,6 @@
 from .auth import is_authorized
-from .preview import send_preview, send_to_channel
+from .channel_cache import channel_cache
+from .fanout import fan_out
+from .preview import send_preview, send_to_channel, stage_message, message_entities
 
-__all__ = ["is_authorized", "send_preview", "send_to_channel"]
+__all__ = ["is_authorized", "channel_cache", "fan_out", "send_preview", "send_to_channel", "stage_message", "message_entities"]
@@ -0,0 +1,64 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import asyncio
+import time
+from bot.logger import setup_logger
+from aiogram.utils.exceptions import TelegramAPIError
+from config import CHANNEL_CACHE_TTL
+
+logger = setup_logger(__name__)
+
+class ChannelMetadataCache:
+    """TTL cache of get_chat results; misses are fetched concurrently and in-flight lookups are shared."""
+
+    def __init__(self, ttl: float = CHANNEL_CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.inflight = {}
+
+    def put(self, channel_id: int, chat):
+        info = {"channel_id": channel_id, "title": chat.title} if chat is not None and chat.type == "channel" else None
+        self.entries[channel_id] = (time.monotonic() + self.ttl, info)
+        return info
+
+    def invalidate(self, channel_id: int = None):
+        if channel_id is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(channel_id, None)
+
+    async def _fetch(self, bot, channel_id: int):
+        try:
+            chat = await bot.get_chat(channel_id)
+            if chat.type != "channel":
+                logger.warning(f"Channel ID {channel_id} is not a channel")
+            return self.put(channel_id, chat)
+        except TelegramAPIError as e:
+            logger.error(f"Error fetching channel {channel_id}: {str(e)}")
+            return self.put(channel_id, None)
+        finally:
+            self.inflight.pop(channel_id, None)
+
+    async def get_many(self, bot, channel_ids) -> list:
+        """Return [{"channel_id", "title"}] for every id that resolves to a channel, in input order."""
+        now = time.monotonic()
+        results = {}
+        pending = {}
+        for channel_id in channel_ids:
+            entry = self.entries.get(channel_id)
+            if entry and entry[0] > now:
+                results[channel_id] = entry[1]
+            elif channel_id not in pending:
+                task = self.inflight.get(channel_id)
+                if task is None:
+                    task = self.inflight[channel_id] = asyncio.ensure_future(self._fetch(bot, channel_id))
+                pending[channel_id] = task
+        if pending:
+            logger.info(f"Channel cache: {len(results)} hit(s), fetching {len(pending)} miss(es)")
+            for channel_id, info in zip(pending, await asyncio.gather(*pending.values())):
+                results[channel_id] = info
+        return [results[channel_id] for channel_id in dict.fromkeys(channel_ids) if results.get(channel_id)]
+
+channel_cache = ChannelMetadataCache()
@@ -0,0 +1,31 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import asyncio
+from bot.logger import setup_logger
+from aiogram.utils.exceptions import TelegramAPIError
+
+logger = setup_logger(__name__)
+
+async def fan_out(channel_ids, operation, concurrency: int):
+    """Run `operation(channel_id)` for every channel with at most `concurrency` calls in flight.
+
+    Returns a dict of channel_id -> result for the successful calls and a list of
+    (channel_id, error) tuples for the failed ones, in the order of `channel_ids`.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(channel_id):
+        async with semaphore:
+            try:
+                return channel_id, await operation(channel_id), None
+            except TelegramAPIError as e:
+                logger.error(f"Operation failed for channel {channel_id}: {str(e)}")
+                return channel_id, None, str(e)
+
+    outcomes = await asyncio.gather(*(run(channel_id) for channel_id in channel_ids))
+    results = {channel_id: result for channel_id, result, error in outcomes if error is None}
+    failed = [(channel_id, error) for channel_id, _, error in outcomes if error is not None]
+    logger.info(f"Fan-out finished: {len(results)} succeeded, {len(failed)} failed (concurrency={concurrency})")
+    return results, failed
@@ -0,0 +1,68 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import asyncio
+from aiogram import types
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from bot.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+LANE_KEY = "_user_lane"
+
+class KeyedLock:
+    """One FIFO asyncio.Lock per key, dropped as soon as nobody holds or waits for it."""
+
+    def __init__(self):
+        self.locks = {}
+
+    async def acquire(self, key):
+        entry = self.locks.get(key)
+        if entry is None:
+            entry = self.locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            self._leave(key, entry)
+            raise
+
+    def release(self, key):
+        entry = self.locks[key]
+        entry[0].release()
+        self._leave(key, entry)
+
+    def _leave(self, key, entry):
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self.locks[key]
+
+def update_user_id(update: types.Update) -> int | None:
+    for event in (update.message, update.edited_message, update.callback_query, update.inline_query):
+        if event is not None and event.from_user is not None:
+            return event.from_user.id
+    return None
+
+class UserLaneMiddleware(BaseMiddleware):
+    """Process each user's updates strictly one after another; different users still run in parallel.
+
+    Polling dispatches a batch of updates concurrently, so without this a double-tapped Confirm can run
+    twice before the first run finishes the FSM session.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lanes = KeyedLock()
+
+    async def on_pre_process_update(self, update: types.Update, data: dict):
+        user_id = update_user_id(update)
+        if user_id is None:
+            return
+        await self.lanes.acquire(user_id)
+        data[LANE_KEY] = user_id
+
+    async def on_post_process_update(self, update: types.Update, results, data: dict):
+        user_id = data.pop(LANE_KEY, None)
+        if user_id is not None:
+            self.lanes.release(user_id)
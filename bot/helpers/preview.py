@@ -4,11 +4,93 @@
 
 from bot.logger import setup_logger
 from aiogram import Bot
-from aiogram.types import InlineKeyboardMarkup, InputMediaPhoto, InputMediaVideo, InputMediaDocument
-from aiogram.utils.exceptions import TelegramAPIError
+from aiogram.types import InlineKeyboardMarkup, InputMediaPhoto, InputMediaVideo, InputMediaDocument, Message, MessageEntity
+from aiogram.utils.exceptions import TelegramAPIError, BadRequest
+from config import COPY_MODE, STAGING_CHAT_ID
 
 logger = setup_logger(__name__)
 
+def message_entities(message: Message) -> dict:
+    """Formatting of `message` to keep in a content dict, so rebuilt sends and edits look like the original."""
+    if message.entities:
+        return {"entities": [entity.to_python() for entity in message.entities]}
+    if message.caption_entities:
+        return {"caption_entities": [entity.to_python() for entity in message.caption_entities]}
+    return {}
+
+def _entities(content: dict, key: str) -> list | None:
+    entities = content.get(key)
+    return [MessageEntity.to_object(entity) for entity in entities] if entities else None
+
+async def _copy_source(bot: Bot, content: dict, reply_markup: InlineKeyboardMarkup, chat_id: int) -> Message | None:
+    """Copy the staged source message; None when it no longer exists, so the caller rebuilds it from the content dict."""
+    try:
+        return await bot.copy_message(
+            chat_id=chat_id,
+            from_chat_id=content["source"]["chat_id"],
+            message_id=content["source"]["message_id"],
+            reply_markup=reply_markup
+        )
+    except BadRequest as e:
+        if "message to copy not found" not in str(e).lower():
+            raise
+        logger.warning(f"Source message {content['source']} is gone, rebuilding it for chat {chat_id}")
+        return None
+
+async def _send_content(bot: Bot, content: dict, reply_markup: InlineKeyboardMarkup, chat_id: int) -> Message:
+    """Send `content` as a new message: copied from its source when there is one, otherwise rebuilt."""
+    if content.get("source"):
+        message = await _copy_source(bot, content, reply_markup, chat_id)
+        if message is not None:
+            return message
+    if content["type"] == "text":
+        return await bot.send_message(
+            chat_id=chat_id,
+            text=content["text"],
+            entities=_entities(content, "entities"),
+            reply_markup=reply_markup,
+            disable_web_page_preview=False
+        )
+    if content["type"] == "photo":
+        return await bot.send_photo(
+            chat_id=chat_id,
+            photo=content["file_id"],
+            caption=content.get("caption", ""),
+            caption_entities=_entities(content, "caption_entities"),
+            reply_markup=reply_markup
+        )
+    if content["type"] == "video":
+        return await bot.send_video(
+            chat_id=chat_id,
+            video=content["file_id"],
+            caption=content.get("caption", ""),
+            caption_entities=_entities(content, "caption_entities"),
+            reply_markup=reply_markup
+        )
+    if content["type"] == "document":
+        return await bot.send_document(
+            chat_id=chat_id,
+            document=content["file_id"],
+            caption=content.get("caption", ""),
+            caption_entities=_entities(content, "caption_entities"),
+            reply_markup=reply_markup
+        )
+    raise ValueError(f"Unsupported content type: {content['type']}")
+
+async def stage_message(bot: Bot, message: Message) -> dict | None:
+    """Return the source reference used to publish `message` with copyMessage, or None when copy mode is off or staging fails."""
+    if not COPY_MODE:
+        return None
+    if not STAGING_CHAT_ID:
+        return {"chat_id": message.chat.id, "message_id": message.message_id}
+    try:
+        staged = await bot.copy_message(chat_id=STAGING_CHAT_ID, from_chat_id=message.chat.id, message_id=message.message_id)
+        logger.info(f"Staged message {message.message_id} from chat {message.chat.id} as {staged.message_id} in {STAGING_CHAT_ID}")
+        return {"chat_id": STAGING_CHAT_ID, "message_id": staged.message_id}
+    except TelegramAPIError as e:
+        logger.error(f"Error staging message {message.message_id}, falling back to rebuilding it: {str(e)}")
+        return None
+
 async def send_preview(bot: Bot, content: dict, reply_markup: InlineKeyboardMarkup, chat_id: int, edit_message_id: int = None, keep_content: bool = False):
     logger.info(f"Sending preview to chat_id={chat_id}, edit_message_id={edit_message_id}, keep_content={keep_content}, content={content}")
     try:
@@ -25,36 +107,7 @@ async def send_preview(bot: Bot, content: dict, reply_markup: InlineKeyboardMark
             logger.error(f"Invalid content provided: {content}")
             raise ValueError("Content is empty or missing 'type' key")
 
-        if content["type"] == "text":
-            message = await bot.send_message(
-                chat_id=chat_id,
-                text=content["text"],
-                reply_markup=reply_markup,
-                disable_web_page_preview=False
-            )
-        elif content["type"] == "photo":
-            message = await bot.send_photo(
-                chat_id=chat_id,
-                photo=content["file_id"],
-                caption=content.get("caption", ""),
-                reply_markup=reply_markup
-            )
-        elif content["type"] == "video":
-            message = await bot.send_video(
-                chat_id=chat_id,
-                video=content["file_id"],
-                caption=content.get("caption", ""),
-                reply_markup=reply_markup
-            )
-        elif content["type"] == "document":
-            message = await bot.send_document(
-                chat_id=chat_id,
-                document=content["file_id"],
-                caption=content.get("caption", ""),
-                reply_markup=reply_markup
-            )
-        else:
-            raise ValueError(f"Unsupported content type: {content['type']}")
+        message = await _send_content(bot, content, reply_markup, chat_id)
         
         logger.info(f"Preview sent successfully to chat_id={chat_id}, message_id={message.message_id}")
         return message
@@ -83,6 +136,7 @@ async def send_to_channel(bot: Bot, content: dict, reply_markup: InlineKeyboardM
                     chat_id=channel_id,
                     message_id=edit_message_id,
                     text=content["text"],
+                    entities=_entities(content, "entities"),
                     reply_markup=reply_markup,
                     disable_web_page_preview=False
                 )
@@ -92,7 +146,8 @@ async def send_to_channel(bot: Bot, content: dict, reply_markup: InlineKeyboardM
                     message_id=edit_message_id,
                     media=InputMediaPhoto(
                         media=content["file_id"],
-                        caption=content.get("caption", "")
+                        caption=content.get("caption", ""),
+                        caption_entities=_entities(content, "caption_entities")
                     ),
                     reply_markup=reply_markup
                 )
@@ -102,7 +157,8 @@ async def send_to_channel(bot: Bot, content: dict, reply_markup: InlineKeyboardM
                     message_id=edit_message_id,
                     media=InputMediaVideo(
                         media=content["file_id"],
-                        caption=content.get("caption", "")
+                        caption=content.get("caption", ""),
+                        caption_entities=_entities(content, "caption_entities")
                     ),
                     reply_markup=reply_markup
                 )
@@ -112,7 +168,8 @@ async def send_to_channel(bot: Bot, content: dict, reply_markup: InlineKeyboardM
                     message_id=edit_message_id,
                     media=InputMediaDocument(
                         media=content["file_id"],
-                        caption=content.get("caption", "")
+                        caption=content.get("caption", ""),
+                        caption_entities=_entities(content, "caption_entities")
                     ),
                     reply_markup=reply_markup
                 )
@@ -121,36 +178,7 @@ async def send_to_channel(bot: Bot, content: dict, reply_markup: InlineKeyboardM
             logger.info(f"Edited message {edit_message_id} in channel {channel_id}")
             return message
         else:
-            if content["type"] == "text":
-                message = await bot.send_message(
-                    chat_id=channel_id,
-                    text=content["text"],
-                    reply_markup=reply_markup,
-                    disable_web_page_preview=False
-                )
-            elif content["type"] == "photo":
-                message = await bot.send_photo(
-                    chat_id=channel_id,
-                    photo=content["file_id"],
-                    caption=content.get("caption", ""),
-                    reply_markup=reply_markup
-                )
-            elif content["type"] == "video":
-                message = await bot.send_video(
-                    chat_id=channel_id,
-                    video=content["file_id"],
-                    caption=content.get("caption", ""),
-                    reply_markup=reply_markup
-                )
-            elif content["type"] == "document":
-                message = await bot.send_document(
-                    chat_id=channel_id,
-                    document=content["file_id"],
-                    caption=content.get("caption", ""),
-                    reply_markup=reply_markup
-                )
-            else:
-                raise ValueError(f"Unsupported content type: {content['type']}")
+            message = await _send_content(bot, content, reply_markup, channel_id)
             logger.info(f"Sent new message to channel {channel_id}, message_id={message.message_id}")
             return message
     except TelegramAPIError as e:
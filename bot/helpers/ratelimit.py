@@ -0,0 +1,145 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import asyncio
+from bot.logger import setup_logger
+from aiogram import Bot
+from aiogram.bot import api
+from aiogram.utils.exceptions import RetryAfter
+from config import FLOOD_GLOBAL_RATE, FLOOD_CHAT_RATE, FLOOD_PRIVATE_RATE, FLOOD_MAX_RETRIES
+
+logger = setup_logger(__name__)
+
+CHAT_BURST = 3
+PRIVATE_BURST = 3
+MAX_IDLE_CHAT_BUCKETS = 1024
+
+THROTTLED_METHODS = {
+    api.Methods.SEND_MESSAGE,
+    api.Methods.SEND_PHOTO,
+    api.Methods.SEND_VIDEO,
+    api.Methods.SEND_DOCUMENT,
+    api.Methods.COPY_MESSAGE,
+    api.Methods.FORWARD_MESSAGE,
+    api.Methods.EDIT_MESSAGE_TEXT,
+    api.Methods.EDIT_MESSAGE_CAPTION,
+    api.Methods.EDIT_MESSAGE_MEDIA,
+    api.Methods.EDIT_MESSAGE_REPLY_MARKUP,
+    api.Methods.DELETE_MESSAGE,
+}
+
+# Lookups share the global budget and flood-control retries, but not the per-chat bucket, which limits messages
+LOOKUP_METHODS = {
+    api.Methods.GET_CHAT,
+    api.Methods.GET_CHAT_MEMBER,
+}
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = 0.0
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """Take one token and return how long the caller has to wait before using it."""
+        self._refill(now)
+        self.tokens -= 1
+        delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(delay, self.blocked_until - now)
+
+    def block(self, now: float, seconds: float):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+def is_private_chat(chat_id) -> bool:
+    """Users have positive ids; groups and channels have negative ids or @usernames."""
+    return isinstance(chat_id, int) and chat_id > 0
+
+class OutboundScheduler:
+    """Global and per-chat token buckets in front of every outbound send/edit call.
+
+    Groups and channels get the per-minute chat rate; private chats get the much higher per-second private rate.
+    """
+
+    def __init__(self, global_rate: float = FLOOD_GLOBAL_RATE, chat_rate: float = FLOOD_CHAT_RATE,
+                 private_rate: float = FLOOD_PRIVATE_RATE, max_retries: int = FLOOD_MAX_RETRIES):
+        self.global_bucket = TokenBucket(global_rate, max(1.0, global_rate))
+        self.chat_rate = chat_rate / 60
+        self.private_rate = private_rate
+        self.max_retries = max_retries
+        self.chat_buckets = {}
+
+    def _chat_bucket(self, chat_id, now: float) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= MAX_IDLE_CHAT_BUCKETS:
+                self.chat_buckets = {cid: b for cid, b in self.chat_buckets.items() if not b.is_idle(now)}
+            if is_private_chat(chat_id):
+                bucket = TokenBucket(self.private_rate, PRIVATE_BURST)
+            else:
+                bucket = TokenBucket(self.chat_rate, CHAT_BURST)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def acquire(self, chat_id=None):
+        loop = asyncio.get_running_loop()
+        if chat_id is not None:
+            delay = self._chat_bucket(chat_id, loop.time()).reserve(loop.time())
+            if delay > 0:
+                await asyncio.sleep(delay)
+        delay = self.global_bucket.reserve(loop.time())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def has_spare_capacity(self, reserve: float = 1.0) -> bool:
+        """True when the global bucket holds more than `reserve` free tokens, i.e. a low-priority call would not delay others."""
+        self.global_bucket._refill(asyncio.get_running_loop().time())
+        return self.global_bucket.tokens > reserve
+
+    async def run(self, chat_id, call):
+        """Await `call()` once the rate limits allow it, re-queuing it when Telegram answers with retry_after."""
+        attempt = 0
+        while True:
+            await self.acquire(chat_id)
+            try:
+                return await call()
+            except RetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    logger.error(f"Giving up on chat {chat_id} after {self.max_retries} flood-control retries")
+                    raise
+                now = asyncio.get_running_loop().time()
+                bucket = self._chat_bucket(chat_id, now) if chat_id is not None else self.global_bucket
+                bucket.block(now, e.timeout)
+                logger.warning(f"Flood control for chat {chat_id}, retrying in {e.timeout}s (attempt {attempt}/{self.max_retries})")
+
+class RateLimitedBot(Bot):
+    """Bot whose send/edit/delete requests and chat lookups all go through an OutboundScheduler."""
+
+    def __init__(self, *args, scheduler: OutboundScheduler = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.outbound = scheduler or OutboundScheduler()
+
+    async def request(self, method, data=None, files=None, **kwargs):
+        if method in THROTTLED_METHODS:
+            chat_id = (data or {}).get("chat_id")
+        elif method in LOOKUP_METHODS:
+            chat_id = None
+        else:
+            return await super().request(method, data, files, **kwargs)
+
+        async def call():
+            return await super(RateLimitedBot, self).request(method, data, files, **kwargs)
+
+        return await self.outbound.run(chat_id, call)
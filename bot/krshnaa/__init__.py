@@ -1,5 +1,5 @@
 from .handlers import register_handlers
-from .broadcaster import broadcast_command, BroadcastState, receive_broadcast_message, receive_broadcast_buttons, handle_broadcast_confirmation
+from .broadcaster import broadcast_command, BroadcastState, receive_broadcast_message, receive_broadcast_buttons, handle_broadcast_confirmation, edit_broadcast_command, BroadcastEditState
 
 __all__ = [
     "register_handlers",
@@ -7,5 +7,7 @@ __all__ = [
     "BroadcastState",
     "receive_broadcast_message",
     "receive_broadcast_buttons",
-    "handle_broadcast_confirmation"
+    "handle_broadcast_confirmation",
+    "edit_broadcast_command",
+    "BroadcastEditState"
 ]
@@ -2,15 +2,21 @@
 # Channel  : https://t.me/NxMirror
 # Contact  : @FTKrshna
 
+import asyncio
+from bson import ObjectId
+from bson.errors import InvalidId
 from aiogram import types
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
-from aiogram.utils.exceptions import TelegramAPIError
+from aiogram.utils.exceptions import TelegramAPIError, NetworkError, MessageToDeleteNotFound, MessageNotModified
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
 from bot.logger import setup_logger
-from ..helpers import is_authorized, send_preview, send_to_channel
-from ..modules import mongo_db
-from config import DEFAULT_CHANNELS
-from .keyboards import create_channel_selection_keyboard, create_button_keyboard, create_confirm_keyboard
+from ..helpers import is_authorized, fan_out, send_preview, send_to_channel, stage_message, message_entities
+from ..modules import mongo_db, post_ledger, channel_registry, popup_store, idempotency_guard, idempotency_key
+from config import BROADCAST_CONCURRENCY, BROADCAST_PROGRESS_INTERVAL
+from .health import PERMANENT_ERRORS
+from .buttons import ButtonSyntaxError
+from .keyboards import create_channel_selection_keyboard, create_button_keyboard, create_confirm_keyboard, create_broadcast_selection_keyboard, create_broadcast_target_keyboard
 from Scripts import FtKrshna
 
 logger = setup_logger(__name__)
@@ -20,6 +26,16 @@ class BroadcastState(StatesGroup):
     WaitingForButtons = State()
     WaitingForPreview = State()
 
+class BroadcastEditState(StatesGroup):
+    WaitingForBroadcast = State()
+    WaitingForContent = State()
+    WaitingForButtons = State()
+    WaitingForPreview = State()
+
+class RetractState(StatesGroup):
+    WaitingForBroadcast = State()
+    WaitingForConfirmation = State()
+
 async def broadcast_command(message: types.Message, state: FSMContext, from_button=False, user_id=None):
     logger.info(f"Received /broadcast from user {user_id or message.from_user.id} (from_button={from_button})")
     effective_user_id = user_id or message.from_user.id
@@ -40,30 +56,195 @@ async def broadcast_command(message: types.Message, state: FSMContext, from_butt
         logger.error(f"Error in /broadcast: {str(e)}")
         await state.finish()
 
-async def get_all_channels(bot):
-    db_channels = await mongo_db.get_channels()
-    channels = db_channels if db_channels else []
-    default_channels = []
+_running_jobs = set()
+CLAIM_RETRY_ROUNDS = 3
+
+class BroadcastProgress:
+    """Live progress message for a running broadcast, edited at most once per interval.
+
+    Deliveries only bump counters; a single ticker renders the latest snapshot, skips the edit
+    when nothing changed or when the global flood budget has no spare tokens for it.
+    """
+
+    def __init__(self, bot, chat_id: int, total: int, pending: int, interval: float = BROADCAST_PROGRESS_INTERVAL):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.total = total
+        self.pending = pending
+        self.interval = interval
+        self.sent = 0
+        self.failed = 0
+        self.message_id = None
+        self.last_text = None
+        self.started = None
+        self.ticker = None
+
+    def record(self, ok):
+        """Count one finished delivery: True for sent, False for failed, None for skipped."""
+        self.pending -= 1
+        if ok is True:
+            self.sent += 1
+        elif ok is False:
+            self.failed += 1
+
+    def render(self, finished: bool = False) -> str:
+        elapsed = max(asyncio.get_running_loop().time() - self.started, 0.001)
+        rate = (self.sent + self.failed) / elapsed
+        eta = f"{self.pending / rate:.0f}s" if rate and self.pending else "-"
+        header = "Broadcast finished." if finished else "Broadcast in progress..."
+        return (
+            f"{header}\n"
+            f"Sent: {self.sent}\n"
+            f"Failed: {self.failed}\n"
+            f"Pending: {self.pending}/{self.total}\n"
+            f"Speed: {rate:.1f} msg/s\n"
+            f"ETA: {eta}"
+        )
+
+    async def start(self):
+        self.started = asyncio.get_running_loop().time()
+        try:
+            self.last_text = self.render()
+            message = await self.bot.send_message(self.chat_id, self.last_text)
+            self.message_id = message.message_id
+            self.ticker = asyncio.create_task(self._tick())
+        except TelegramAPIError as e:
+            logger.warning(f"Failed to send broadcast progress message: {str(e)}")
+
+    async def _tick(self):
+        outbound = getattr(self.bot, "outbound", None)
+        while True:
+            await asyncio.sleep(self.interval)
+            if outbound and not outbound.has_spare_capacity():
+                continue
+            await self._edit(self.render())
+
+    async def _edit(self, text: str):
+        if text == self.last_text or not self.message_id:
+            return
+        try:
+            await self.bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id)
+            self.last_text = text
+        except TelegramAPIError as e:
+            logger.warning(f"Failed to update broadcast progress message: {str(e)}")
+
+    async def stop(self):
+        if self.ticker:
+            self.ticker.cancel()
+        await self._edit(self.render(finished=True))
+
+async def run_broadcast_job(bot, job):
+    """Deliver a stored broadcast job to every channel still pending and report the result to the admin.
+
+    Deliveries whose claim hit a database error stay pending and are retried a few times; the job is only
+    marked done once nothing is pending, otherwise it is resumed on the next start.
+    """
+    job_id = job["_id"]
+    content = job["content"]
+    reply_markup = types.InlineKeyboardMarkup.to_object(job["reply_markup"]) if job.get("reply_markup") else None
+    interrupted = await mongo_db.fail_interrupted_deliveries(job_id)
+    if interrupted:
+        logger.warning(f"Broadcast job {job_id}: {interrupted} deliveries were interrupted and will not be retried")
+    channel_ids = await mongo_db.get_pending_deliveries(job_id)
+    logger.info(f"Running broadcast job {job_id}: {len(channel_ids)}/{job['total']} channels pending")
+    progress = BroadcastProgress(bot, job["chat_id"], job["total"], len(channel_ids))
+    await progress.start()
+    succeeded, permanently_failed = [], []
+
+    async def deliver(channel_id):
+        claimed = await mongo_db.claim_delivery(job_id, channel_id)
+        if claimed is None:
+            logger.warning(f"Could not claim delivery of job {job_id} to channel {channel_id}, leaving it pending")
+            return None
+        if not claimed:
+            logger.warning(f"Delivery of job {job_id} to channel {channel_id} already claimed, skipping")
+            progress.record(None)
+            return None
+        try:
+            message = await send_to_channel(bot, content, reply_markup, channel_id)
+        except TelegramAPIError as e:
+            await mongo_db.complete_delivery(job_id, channel_id, error=str(e))
+            progress.record(False)
+            if isinstance(e, PERMANENT_ERRORS):
+                permanently_failed.append(channel_id)
+            raise
+        except Exception as e:
+            logger.exception(f"Unexpected error delivering job {job_id} to channel {channel_id}: {str(e)}")
+            await mongo_db.complete_delivery(job_id, channel_id, error=f"unexpected error: {str(e)}")
+            progress.record(False)
+            return None
+        await mongo_db.complete_delivery(job_id, channel_id, message_id=message.message_id)
+        succeeded.append(channel_id)
+        post_ledger.record(channel_id, message.message_id, content, reply_markup, broadcast_id=job_id)
+        progress.record(True)
+        logger.info(f"Broadcasted message to channel {channel_id}")
+        return message
+
     try:
-        if DEFAULT_CHANNELS:
-            for channel_id in DEFAULT_CHANNELS:
-                try:
-                    chat = await bot.get_chat(channel_id)
-                    if chat.type == "channel":
-                        default_channels.append({"channel_id": channel_id, "title": chat.title})
-                    else:
-                        logger.warning(f"Default channel ID {channel_id} is not a channel")
-                except TelegramAPIError as e:
-                    logger.error(f"Error fetching default channel {channel_id}: {str(e)}")
-            channel_ids = {ch["channel_id"] for ch in channels}
-            for def_ch in default_channels:
-                if def_ch["channel_id"] not in channel_ids:
-                    channels.append(def_ch)
-            logger.info(f"Combined channels for broadcast: {len(channels)} (DB: {len(db_channels)}, Default: {len(default_channels)})")
-    except NameError:
-        logger.info("DEFAULT_CHANNELS not defined, using only database channels")
-    return channels
+        for attempt in range(CLAIM_RETRY_ROUNDS):
+            if attempt:
+                await asyncio.sleep(2 ** attempt)
+                channel_ids = await mongo_db.get_pending_deliveries(job_id)
+                if not channel_ids:
+                    break
+                logger.info(f"Broadcast job {job_id}: retrying {len(channel_ids)} unclaimed deliveries")
+            await fan_out(channel_ids, deliver, BROADCAST_CONCURRENCY)
+    finally:
+        await progress.stop()
+        await post_ledger.flush()
+    quarantined = await channel_registry.record_delivery_outcomes(succeeded, permanently_failed)
+
+    deliveries = await mongo_db.get_deliveries(job_id)
+    success_count = sum(1 for d in deliveries if d["status"] == "sent")
+    failed_channels = [(d["channel_id"], d.get("error", "")) for d in deliveries if d["status"] == "failed"]
+    pending_channels = [d["channel_id"] for d in deliveries if d["status"] == "pending"]
+    unknown_channels = [d["channel_id"] for d in deliveries if d["status"] == "sending"]
+    if deliveries and not pending_channels:
+        await mongo_db.finish_broadcast_job(job_id)
+        response = f"Broadcast completed: {success_count}/{job['total']} channels successful."
+    elif deliveries:
+        response = (
+            f"Broadcast paused: {success_count}/{job['total']} channels successful, "
+            f"{len(pending_channels)} still pending (will be retried on the next restart)."
+        )
+    else:
+        response = f"Broadcast status unknown: could not read the delivery records of job {job_id}. It will be resumed on the next restart."
+    if failed_channels:
+        response += "\nFailed channels:\n" + "\n".join(f"{ch[0]}: {ch[1]}" for ch in failed_channels)
+    if pending_channels:
+        response += "\nPending channels: " + ", ".join(str(ch) for ch in pending_channels)
+    if unknown_channels:
+        response += "\nDelivery status unknown: " + ", ".join(str(ch) for ch in unknown_channels)
+    if quarantined:
+        response += f"\nQuarantined after repeated failures: {', '.join(str(ch) for ch in quarantined)}"
+    await bot.send_message(job["chat_id"], response)
 
+def start_broadcast_job(bot, job):
+    async def runner():
+        try:
+            await run_broadcast_job(bot, job)
+        except Exception as e:
+            logger.exception(f"Broadcast job {job['_id']} stopped with an error: {str(e)}")
+            try:
+                await bot.send_message(
+                    job["chat_id"],
+                    f"Broadcast stopped with an error: {str(e)}\nUndelivered channels will be retried on the next restart."
+                )
+            except TelegramAPIError as report_error:
+                logger.error(f"Failed to report broadcast job {job['_id']} error: {str(report_error)}")
+
+    task = asyncio.create_task(runner())
+    _running_jobs.add(task)
+    task.add_done_callback(_running_jobs.discard)
+    return task
+
+async def resume_broadcast_jobs(bot) -> int:
+    """Restart every broadcast job left unfinished by a previous process."""
+    jobs = await mongo_db.get_unfinished_broadcast_jobs()
+    for job in jobs:
+        logger.info(f"Resuming broadcast job {job['_id']}")
+        start_broadcast_job(bot, job)
+    return len(jobs)
 
 async def receive_broadcast_message(message: types.Message, state: FSMContext):
     user_data = await state.get_data()
@@ -95,7 +276,12 @@ async def receive_broadcast_message(message: types.Message, state: FSMContext):
         await state.finish()
         return
 
+    content.update(message_entities(message))
+
     try:
+        source = await stage_message(message.bot, message)
+        if source:
+            content["source"] = source
         await state.update_data(content=content)
         await message.reply(
             FtKrshna.DEFAULT_BUTTONS_TEXT,
@@ -135,17 +321,27 @@ async def receive_broadcast_buttons(message: types.Message, state: FSMContext):
             reply_markup = create_button_keyboard(message.text, for_preview=True)
             logger.debug(f"Generated preview reply_markup for user {message.from_user.id}: {reply_markup}")
         preview_message = await send_preview(message.bot, content, reply_markup, message.chat.id)
-        await state.update_data(preview_message_id=preview_message.message_id, reply_markup=reply_markup)
-        await message.reply(
-            "Preview sent. Please confirm to broadcast to all channels or cancel:",
-            reply_markup=create_confirm_keyboard()
-        )
+        await state.update_data(preview_message_id=preview_message.message_id, reply_markup=reply_markup, target_tags=[])
+        tags = await mongo_db.get_all_tags()
+        if tags:
+            await message.reply(
+                "Preview sent. Pick tags to broadcast only to those channels (none = all channels), then confirm or cancel:",
+                reply_markup=create_broadcast_target_keyboard(tags, [])
+            )
+        else:
+            await message.reply(
+                "Preview sent. Please confirm to broadcast to all channels or cancel:",
+                reply_markup=create_confirm_keyboard()
+            )
         await BroadcastState.WaitingForPreview.set()
         logger.info(f"Sent broadcast preview to user {message.from_user.id}")
     except TelegramAPIError as e:
         await message.reply(f"Error sending preview: {str(e)}")
         logger.error(f"TelegramAPIError in receive_broadcast_buttons: {str(e)}")
         await state.finish()
+    except ButtonSyntaxError as e:
+        await message.reply(f"Invalid button format at {e}. Fix it and send the buttons again, or send 'none'.")
+        logger.warning(f"Button syntax error in receive_broadcast_buttons from user {message.from_user.id}: {str(e)}")
     except ValueError as e:
         await message.reply("Invalid button format. Please use the specified format or send 'none'.")
         logger.error(f"ValueError in receive_broadcast_buttons: {str(e)}")
@@ -155,6 +351,28 @@ async def receive_broadcast_buttons(message: types.Message, state: FSMContext):
         logger.error(f"Unexpected error in receive_broadcast_buttons: {str(e)}")
         await state.finish()
 
+async def toggle_broadcast_tag(callback_query: types.CallbackQuery, state: FSMContext):
+    user_data = await state.get_data()
+    if callback_query.from_user.id != user_data.get("user_id"):
+        await callback_query.answer()
+        logger.warning(f"User mismatch in broadcast tag toggle: {callback_query.from_user.id} vs {user_data.get('user_id')}")
+        return
+    try:
+        _, tag = callback_query.data.split(":", 1)
+        selected = list(user_data.get("target_tags") or [])
+        if tag in selected:
+            selected.remove(tag)
+        else:
+            selected.append(tag)
+        await state.update_data(target_tags=selected)
+        tags = await mongo_db.get_all_tags()
+        await callback_query.message.edit_reply_markup(reply_markup=create_broadcast_target_keyboard(tags, selected))
+        await callback_query.answer(f"Target: {', '.join(selected)}" if selected else "Target: all channels")
+        logger.info(f"User {callback_query.from_user.id} set broadcast target tags to {selected}")
+    except TelegramAPIError as e:
+        await callback_query.answer("Error updating target.")
+        logger.error(f"TelegramAPIError in toggle_broadcast_tag: {str(e)}")
+
 async def handle_broadcast_confirmation(callback_query: types.CallbackQuery, state: FSMContext):
     user_data = await state.get_data()
     if callback_query.from_user.id != user_data.get("user_id"):
@@ -167,27 +385,47 @@ async def handle_broadcast_confirmation(callback_query: types.CallbackQuery, sta
     preview_message_id = user_data.get("preview_message_id")
     try:
         if callback_query.data == "confirm_post":
-            channels = await get_all_channels(callback_query.bot)
+            if not await popup_store.flush():
+                await callback_query.answer("Could not save popup texts. Please tap Confirm again.")
+                logger.error(f"Popup texts not stored, broadcast of user {callback_query.from_user.id} not published")
+                return
+            target_tags = user_data.get("target_tags")
+            key = idempotency_key(callback_query.from_user.id, "broadcast", preview_message_id, content, reply_markup, target=sorted(target_tags or []))
+            if not await idempotency_guard.claim(key):
+                await callback_query.answer("This broadcast was already confirmed.")
+                logger.warning(f"Duplicate broadcast confirmation from user {callback_query.from_user.id}")
+                return
+            if target_tags:
+                channels = await mongo_db.get_channels_by_tags(target_tags)
+                logger.info(f"Resolved {len(channels)} channels for tags {target_tags}")
+            else:
+                channels = await channel_registry.get_channels(callback_query.bot, skip_unreachable=True)
             if not channels:
                 await callback_query.message.reply("No channels available for broadcasting.")
                 logger.info("No channels found for broadcast")
                 await state.finish()
                 return
-            success_count = 0
-            failed_channels = []
-            for channel in channels:
-                channel_id = channel["channel_id"]
-                try:
-                    await send_to_channel(callback_query.bot, content, reply_markup, channel_id)
-                    success_count += 1
-                    logger.info(f"Broadcasted message to channel {channel_id}")
-                except TelegramAPIError as e:
-                    failed_channels.append((channel_id, str(e)))
-                    logger.error(f"Failed to broadcast to channel {channel_id}: {str(e)}")
-            response = f"Broadcast completed: {success_count}/{len(channels)} channels successful."
-            if failed_channels:
-                response += "\nFailed channels:\n" + "\n".join(f"{ch[0]}: {ch[1]}" for ch in failed_channels)
-            await callback_query.message.reply(response)
+            markup_data = reply_markup.to_python() if reply_markup else None
+            job_id = await mongo_db.create_broadcast_job(
+                user_id=callback_query.from_user.id,
+                chat_id=callback_query.message.chat.id,
+                content=content,
+                reply_markup=markup_data,
+                channel_ids=[ch["channel_id"] for ch in channels]
+            )
+            if not job_id:
+                await callback_query.message.reply("Error saving broadcast. Please try again.")
+                await state.finish()
+                return
+            job = {
+                "_id": job_id,
+                "chat_id": callback_query.message.chat.id,
+                "content": content,
+                "reply_markup": markup_data,
+                "total": len(channels)
+            }
+            start_broadcast_job(callback_query.bot, job)
+            await callback_query.message.reply(f"Broadcast started to {len(channels)} channels. You will get a report when it completes.")
         else:
             await callback_query.message.reply("Broadcast canceled.")
             logger.info(f"Broadcast canceled by user {callback_query.from_user.id}")
@@ -202,3 +440,327 @@ async def handle_broadcast_confirmation(callback_query: types.CallbackQuery, sta
         await callback_query.message.reply("Error processing broadcast confirmation.")
         logger.error(f"Unexpected error in handle_broadcast_confirmation: {str(e)}")
         await state.finish()
+
+async def edit_broadcast_posts(bot, posts, content, reply_markup, keep_content: bool, concurrency: int = BROADCAST_CONCURRENCY):
+    """Apply new content and/or buttons to every recorded copy of a broadcast and return (success_count, failed_channels)."""
+    async def edit(channel_id):
+        message_id = message_ids[channel_id]
+        try:
+            result = await send_to_channel(
+                bot,
+                content=content,
+                reply_markup=reply_markup,
+                channel_id=channel_id,
+                edit_message_id=message_id,
+                keep_content=keep_content
+            )
+        except MessageNotModified:
+            logger.info(f"Message {message_id} in channel {channel_id} already up to date")
+            result = True
+        post_ledger.record(channel_id, message_id, None if keep_content else content, reply_markup)
+        return result
+
+    message_ids = {post["channel_id"]: post["message_id"] for post in posts}
+    edited, failed_channels = await fan_out(list(message_ids), edit, concurrency)
+    await post_ledger.flush()
+    return len(edited), failed_channels
+
+async def edit_broadcast_command(message: types.Message, state: FSMContext, from_button=False, user_id=None):
+    logger.info(f"Received /editbroadcast from user {user_id or message.from_user.id} (from_button={from_button})")
+    effective_user_id = user_id or message.from_user.id
+    if not is_authorized(effective_user_id):
+        await message.reply("You are not authorized to use this command.")
+        logger.warning(f"Unauthorized user {effective_user_id} attempted /editbroadcast")
+        return
+    jobs = await mongo_db.get_recent_broadcast_jobs()
+    if not jobs:
+        await message.reply("No recorded broadcasts found. Use /broadcast to send one first.")
+        logger.info("No broadcasts found for /editbroadcast")
+        await state.finish()
+        return
+    try:
+        await message.reply(
+            "Please select the broadcast you want to edit:",
+            reply_markup=create_broadcast_selection_keyboard(jobs)
+        )
+        await BroadcastEditState.WaitingForBroadcast.set()
+        await state.update_data(user_id=effective_user_id, flow="edit_broadcast")
+        logger.info(f"Sent broadcast selection keyboard to user {effective_user_id}")
+    except Exception as e:
+        await message.reply("Error displaying broadcasts.")
+        logger.error(f"Error in /editbroadcast: {str(e)}")
+        await state.finish()
+
+async def select_broadcast(callback_query: types.CallbackQuery, state: FSMContext):
+    logger.info(f"Received select_broadcast callback from user {callback_query.from_user.id}: {callback_query.data}")
+    if not is_authorized(callback_query.from_user.id):
+        await callback_query.answer("You are not authorized.")
+        logger.warning(f"Unauthorized user {callback_query.from_user.id} attempted broadcast selection")
+        return
+    try:
+        _, job_id = callback_query.data.split(":", 1)
+        job = await mongo_db.get_broadcast_job(ObjectId(job_id))
+        if not job:
+            await callback_query.answer("Broadcast not found.")
+            logger.error(f"Broadcast job {job_id} not found")
+            return
+        await state.update_data(broadcast_id=job_id)
+        await callback_query.message.edit_text(
+            "Send the new content (text, photo, video, or document) or type 'keep' to keep the existing content.",
+            reply_markup=create_channel_selection_keyboard([], show_back=True, show_close=True)
+        )
+        await BroadcastEditState.WaitingForContent.set()
+        await callback_query.answer()
+    except InvalidId as e:
+        await callback_query.answer("Invalid broadcast.")
+        logger.error(f"InvalidId in select_broadcast: {str(e)}")
+    except Exception as e:
+        await callback_query.answer("An unexpected error occurred.")
+        logger.error(f"Unexpected error in select_broadcast: {str(e)}")
+        await state.finish()
+
+async def receive_broadcast_edit_content(message: types.Message, state: FSMContext):
+    user_data = await state.get_data()
+    if message.from_user.id != user_data.get("user_id"):
+        logger.warning(f"User mismatch: {message.from_user.id} vs {user_data.get('user_id')}")
+        return
+    logger.info(f"Received broadcast edit content from user {message.from_user.id}")
+    try:
+        if message.text and message.text.lower() == "keep":
+            await state.update_data(keep_content=True)
+        else:
+            content = {}
+            if message.text:
+                content["type"] = "text"
+                content["text"] = message.text
+            elif message.photo:
+                content["type"] = "photo"
+                content["file_id"] = message.photo[-1].file_id
+                content["caption"] = message.caption or ""
+            elif message.video:
+                content["type"] = "video"
+                content["file_id"] = message.video.file_id
+                content["caption"] = message.caption or ""
+            elif message.document:
+                content["type"] = "document"
+                content["file_id"] = message.document.file_id
+                content["caption"] = message.caption or ""
+            else:
+                await message.reply("Unsupported content type. Please send text, photo, video, document, or 'keep'.")
+                logger.error(f"Unsupported content type from user {message.from_user.id}")
+                await state.finish()
+                return
+            content.update(message_entities(message))
+            await state.update_data(content=content, keep_content=False)
+        await message.reply(
+            "Send the new buttons in the same format as before, 'keep' to keep the existing buttons, or 'none' to remove them.",
+            reply_markup=create_channel_selection_keyboard([], show_back=True, show_close=True)
+        )
+        await BroadcastEditState.WaitingForButtons.set()
+        logger.info(f"Prompted user {message.from_user.id} for broadcast edit buttons")
+    except Exception as e:
+        await message.reply("Error processing content.")
+        logger.error(f"Error in receive_broadcast_edit_content: {str(e)}")
+        await state.finish()
+
+async def receive_broadcast_edit_buttons(message: types.Message, state: FSMContext):
+    user_data = await state.get_data()
+    if message.from_user.id != user_data.get("user_id"):
+        logger.warning(f"User mismatch: {message.from_user.id} vs {user_data.get('user_id')}")
+        return
+    logger.info(f"Received broadcast edit buttons from user {message.from_user.id}: {message.text}")
+    keep_content = user_data.get("keep_content", False)
+    try:
+        job = await mongo_db.get_broadcast_job(ObjectId(user_data.get("broadcast_id")))
+        if not job:
+            await message.reply("Broadcast not found. Please start over with /editbroadcast.")
+            await state.finish()
+            return
+        button_text = message.text.strip()
+        if button_text.lower() == "keep":
+            if keep_content:
+                await message.reply("No changes provided. Please update content or buttons.")
+                logger.error(f"No changes provided by user {message.from_user.id}")
+                await state.finish()
+                return
+            reply_markup = types.InlineKeyboardMarkup.to_object(job["reply_markup"]) if job.get("reply_markup") else None
+        elif button_text.lower() == "none":
+            reply_markup = None
+        else:
+            reply_markup = create_button_keyboard(button_text, for_preview=True)
+        content = {} if keep_content else user_data.get("content")
+        preview_message = await send_preview(message.bot, content, reply_markup, message.chat.id, keep_content=keep_content)
+        await state.update_data(preview_message_id=preview_message.message_id, reply_markup=reply_markup)
+        await message.reply(
+            "Preview sent. Please confirm to update every channel copy of this broadcast or cancel:",
+            reply_markup=create_confirm_keyboard()
+        )
+        await BroadcastEditState.WaitingForPreview.set()
+        logger.info(f"Sent broadcast edit preview to user {message.from_user.id}")
+    except TelegramAPIError as e:
+        await message.reply(f"Error sending preview: {str(e)}")
+        logger.error(f"TelegramAPIError in receive_broadcast_edit_buttons: {str(e)}")
+        await state.finish()
+    except ButtonSyntaxError as e:
+        await message.reply(f"Invalid button format at {e}. Fix it and send the buttons again, or send 'keep' or 'none'.")
+        logger.warning(f"Button syntax error in receive_broadcast_edit_buttons from user {message.from_user.id}: {str(e)}")
+    except ValueError as e:
+        await message.reply("Invalid button format. Please use the specified format, 'keep' or 'none'.")
+        logger.error(f"ValueError in receive_broadcast_edit_buttons: {str(e)}")
+        await state.finish()
+    except Exception as e:
+        await message.reply("Error processing buttons. Please try again or use /cancel.")
+        logger.error(f"Unexpected error in receive_broadcast_edit_buttons: {str(e)}")
+        await state.finish()
+
+async def handle_broadcast_edit_confirmation(callback_query: types.CallbackQuery, state: FSMContext):
+    user_data = await state.get_data()
+    if callback_query.from_user.id != user_data.get("user_id"):
+        await callback_query.answer()
+        logger.warning(f"User mismatch in broadcast edit confirmation: {callback_query.from_user.id} vs {user_data.get('user_id')}")
+        return
+    logger.info(f"Received broadcast edit confirmation from user {callback_query.from_user.id}: {callback_query.data}")
+    await callback_query.answer()
+    keep_content = user_data.get("keep_content", False)
+    content = {} if keep_content else user_data.get("content")
+    reply_markup = user_data.get("reply_markup")
+    preview_message_id = user_data.get("preview_message_id")
+    try:
+        if callback_query.data == "confirm_post":
+            if not await popup_store.flush():
+                await callback_query.message.reply("Could not save popup texts. Please tap Confirm again.")
+                logger.error(f"Popup texts not stored, broadcast edit of user {callback_query.from_user.id} not published")
+                return
+            job_id = ObjectId(user_data.get("broadcast_id"))
+            posts = await mongo_db.get_broadcast_posts(job_id)
+            if not posts:
+                await callback_query.message.reply("No delivered copies recorded for this broadcast.")
+                logger.info(f"No ledger entries for broadcast {job_id}")
+            else:
+                success_count, failed_channels = await edit_broadcast_posts(callback_query.bot, posts, content, reply_markup, keep_content)
+                fields = {"reply_markup": reply_markup.to_python() if reply_markup else None}
+                if not keep_content:
+                    fields["content"] = content
+                await mongo_db.update_broadcast_job(job_id, fields)
+                response = f"Broadcast edit completed: {success_count}/{len(posts)} channels updated."
+                if failed_channels:
+                    response += "\nFailed channels:\n" + "\n".join(f"{ch[0]}: {ch[1]}" for ch in failed_channels)
+                await callback_query.message.reply(response)
+                logger.info(f"Edited broadcast {job_id} in {success_count}/{len(posts)} channels by user {callback_query.from_user.id}")
+        else:
+            await callback_query.message.reply("Broadcast edit canceled.")
+            logger.info(f"Broadcast edit canceled by user {callback_query.from_user.id}")
+        try:
+            await callback_query.bot.delete_message(chat_id=callback_query.message.chat.id, message_id=preview_message_id)
+        except Exception as e:
+            logger.warning(f"Failed to delete preview message: {str(e)}")
+        await callback_query.message.delete()
+        await state.finish()
+    except Exception as e:
+        await callback_query.message.reply("Error processing broadcast edit confirmation.")
+        logger.error(f"Unexpected error in handle_broadcast_edit_confirmation: {str(e)}")
+        await state.finish()
+
+async def retract_broadcast_posts(bot, posts, concurrency: int = BROADCAST_CONCURRENCY):
+    """Delete every recorded copy of a broadcast, retrying transient errors, and return (deleted_channel_ids, failed_channels)."""
+    async def delete(channel_id):
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception_type((NetworkError, asyncio.TimeoutError)),
+            stop=stop_after_attempt(3),
+            wait=wait_exponential(multiplier=1, max=10),
+            reraise=True
+        ):
+            with attempt:
+                try:
+                    return await bot.delete_message(chat_id=channel_id, message_id=message_ids[channel_id])
+                except MessageToDeleteNotFound:
+                    logger.info(f"Message {message_ids[channel_id]} already gone from channel {channel_id}")
+                    return True
+
+    message_ids = {post["channel_id"]: post["message_id"] for post in posts}
+    deleted, failed_channels = await fan_out(list(message_ids), delete, concurrency)
+    return list(deleted), failed_channels
+
+async def retract_broadcast_command(message: types.Message, state: FSMContext, from_button=False, user_id=None):
+    logger.info(f"Received /retractbroadcast from user {user_id or message.from_user.id} (from_button={from_button})")
+    effective_user_id = user_id or message.from_user.id
+    if not is_authorized(effective_user_id):
+        await message.reply("You are not authorized to use this command.")
+        logger.warning(f"Unauthorized user {effective_user_id} attempted /retractbroadcast")
+        return
+    jobs = await mongo_db.get_recent_broadcast_jobs()
+    if not jobs:
+        await message.reply("No recorded broadcasts found.")
+        logger.info("No broadcasts found for /retractbroadcast")
+        await state.finish()
+        return
+    try:
+        await message.reply(
+            "Please select the broadcast you want to delete from all channels:",
+            reply_markup=create_broadcast_selection_keyboard(jobs, action="retract_broadcast")
+        )
+        await RetractState.WaitingForBroadcast.set()
+        await state.update_data(user_id=effective_user_id, flow="retract")
+        logger.info(f"Sent retract selection keyboard to user {effective_user_id}")
+    except Exception as e:
+        await message.reply("Error displaying broadcasts.")
+        logger.error(f"Error in /retractbroadcast: {str(e)}")
+        await state.finish()
+
+async def select_broadcast_to_retract(callback_query: types.CallbackQuery, state: FSMContext):
+    logger.info(f"Received retract_broadcast callback from user {callback_query.from_user.id}: {callback_query.data}")
+    if not is_authorized(callback_query.from_user.id):
+        await callback_query.answer("You are not authorized.")
+        logger.warning(f"Unauthorized user {callback_query.from_user.id} attempted broadcast retract")
+        return
+    try:
+        _, job_id = callback_query.data.split(":", 1)
+        posts = await mongo_db.get_broadcast_posts(ObjectId(job_id))
+        if not posts:
+            await callback_query.answer("No delivered copies recorded for this broadcast.")
+            logger.info(f"No ledger entries for broadcast {job_id}")
+            return
+        await state.update_data(broadcast_id=job_id)
+        await callback_query.message.edit_text(
+            f"This will delete the broadcast from {len(posts)} channel(s). Confirm?",
+            reply_markup=create_confirm_keyboard()
+        )
+        await RetractState.WaitingForConfirmation.set()
+        await callback_query.answer()
+    except InvalidId as e:
+        await callback_query.answer("Invalid broadcast.")
+        logger.error(f"InvalidId in select_broadcast_to_retract: {str(e)}")
+    except Exception as e:
+        await callback_query.answer("An unexpected error occurred.")
+        logger.error(f"Unexpected error in select_broadcast_to_retract: {str(e)}")
+        await state.finish()
+
+async def handle_retract_confirmation(callback_query: types.CallbackQuery, state: FSMContext):
+    user_data = await state.get_data()
+    if callback_query.from_user.id != user_data.get("user_id"):
+        await callback_query.answer()
+        logger.warning(f"User mismatch in retract confirmation: {callback_query.from_user.id} vs {user_data.get('user_id')}")
+        return
+    logger.info(f"Received retract confirmation from user {callback_query.from_user.id}: {callback_query.data}")
+    await callback_query.answer()
+    try:
+        if callback_query.data == "confirm_post":
+            job_id = ObjectId(user_data.get("broadcast_id"))
+            posts = await mongo_db.get_broadcast_posts(job_id)
+            deleted, failed_channels = await retract_broadcast_posts(callback_query.bot, posts)
+            await mongo_db.delete_broadcast_posts(job_id, deleted)
+            if not failed_channels:
+                await mongo_db.update_broadcast_job(job_id, {"status": "retracted"})
+            response = f"Broadcast retracted: {len(deleted)}/{len(posts)} copies deleted."
+            if failed_channels:
+                response += "\nCould not delete:\n" + "\n".join(f"{ch[0]}: {ch[1]}" for ch in failed_channels)
+            await callback_query.message.edit_text(response)
+            logger.info(f"Retracted broadcast {job_id} from {len(deleted)}/{len(posts)} channels by user {callback_query.from_user.id}")
+        else:
+            await callback_query.message.edit_text("Retract canceled.")
+            logger.info(f"Retract canceled by user {callback_query.from_user.id}")
+        await state.finish()
+    except Exception as e:
+        await callback_query.message.reply("Error processing retract confirmation.")
+        logger.error(f"Unexpected error in handle_retract_confirmation: {str(e)}")
+        await state.finish()
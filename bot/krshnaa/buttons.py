@@ -0,0 +1,106 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+from dataclasses import dataclass
+from functools import lru_cache
+from aiogram.types import InlineKeyboardButton
+from bot.logger import setup_logger
+from ..modules.popups import popup_store, MAX_POPUP_LENGTH
+
+logger = setup_logger(__name__)
+
+PARSE_CACHE_SIZE = 512
+URL_PREFIXES = ("http://", "https://", "t.me/")
+CALLBACK_PREFIXES = ("popup:", "alert:")
+SHARE_PREFIX = "share:"
+# callback_data prefixes of stored popup/alert texts; the legacy inline form is `popup:<text>`
+POPUP_DATA_PREFIX = "pp:"
+ALERT_DATA_PREFIX = "pa:"
+
+@dataclass(frozen=True, slots=True)
+class ButtonSpec:
+    """One parsed button: `kind` is "url", "popup", "alert" or "share"; popup/alert `value` is the popup text."""
+    text: str
+    kind: str
+    value: str
+
+    def to_button(self) -> InlineKeyboardButton:
+        if self.kind == "url":
+            return InlineKeyboardButton(self.text, url=self.value)
+        if self.kind == "share":
+            return InlineKeyboardButton(self.text, switch_inline_query=self.value)
+        prefix = POPUP_DATA_PREFIX if self.kind == "popup" else ALERT_DATA_PREFIX
+        return InlineKeyboardButton(self.text, callback_data=prefix + popup_store.put(self.value))
+
+class ButtonSyntaxError(ValueError):
+    """Malformed button markup; `line` and `column` are 1-based positions in the admin's text."""
+
+    def __init__(self, line: int, column: int, reason: str):
+        super().__init__(f"line {line}, column {column}: {reason}")
+        self.line = line
+        self.column = column
+        self.reason = reason
+
+def _parse_action(action: str):
+    if action.startswith(URL_PREFIXES):
+        return "url", action
+    if action.startswith(CALLBACK_PREFIXES):
+        kind, text = action.split(":", 1)
+        return kind, text.strip()
+    if action.startswith(SHARE_PREFIX):
+        return "share", action[len(SHARE_PREFIX):].strip()
+    return None
+
+def _parse_pair(pair: str, line: int, column: int) -> ButtonSpec:
+    """Parse `Text - action`; the separator is the first "-" followed by a valid action, so texts may contain dashes."""
+    separator = pair.find("-")
+    if separator < 0:
+        raise ButtonSyntaxError(line, column, f"expected `Text - action`, got `{pair.strip()}`")
+    first_separator = separator
+    while separator >= 0:
+        parsed = _parse_action(pair[separator + 1:].strip())
+        if parsed:
+            break
+        separator = pair.find("-", separator + 1)
+    else:
+        action = pair[first_separator + 1:]
+        action_column = column + first_separator + 1 + len(action) - len(action.lstrip())
+        raise ButtonSyntaxError(
+            line, action_column,
+            f"unknown action `{action.strip()}` (use a URL, popup:, alert: or share:)"
+        )
+    text = pair[:separator].strip()
+    if not text:
+        raise ButtonSyntaxError(line, column, "button text is empty")
+    kind, value = parsed
+    if kind in ("popup", "alert"):
+        value_column = column + separator + 1 + len(pair[separator + 1:]) - len(pair[separator + 1:].lstrip())
+        if not value:
+            raise ButtonSyntaxError(line, value_column, f"{kind} text is empty")
+        if len(value) > MAX_POPUP_LENGTH:
+            raise ButtonSyntaxError(line, value_column, f"{kind} text is {len(value)} characters, the limit is {MAX_POPUP_LENGTH}")
+    return ButtonSpec(text, kind, value)
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def compile_buttons(button_text: str) -> tuple:
+    """Compile button markup into immutable rows of ButtonSpec; results are memoized per text.
+
+    One line per row, `&&` between buttons of a row. Raises ButtonSyntaxError on the first malformed button.
+    """
+    rows = []
+    for line_number, line in enumerate(button_text.split("\n"), start=1):
+        if not line.strip():
+            continue
+        row = []
+        offset = 0
+        for pair in line.split("&&"):
+            row.append(_parse_pair(pair, line_number, offset + 1))
+            offset += len(pair) + 2
+        rows.append(tuple(row))
+    logger.debug(f"Compiled {len(rows)} button row(s)")
+    return tuple(rows)
+
+def build_button_rows(rows: tuple) -> list:
+    """Fresh InlineKeyboardButton rows for compiled ButtonSpec rows."""
+    return [[spec.to_button() for spec in row] for row in rows]
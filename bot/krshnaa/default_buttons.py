@@ -0,0 +1,66 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+from bot.logger import setup_logger
+from ..modules import mongo_db
+from .keyboards import create_button_keyboard
+from .buttons import compile_buttons, build_button_rows
+
+logger = setup_logger(__name__)
+
+_MISSING = object()
+
+class DefaultButtonsCache:
+    """Per-user cache of default buttons: the raw text and its compiled ButtonSpec rows, refreshed only on set/delete."""
+
+    def __init__(self):
+        self.entries = {}
+
+    async def get(self, user_id: int):
+        """Return (button_text, rows) for the user, or None when no default buttons are set."""
+        entry = self.entries.get(user_id, _MISSING)
+        if entry is _MISSING:
+            button_text = await mongo_db.get_default_buttons(user_id)
+            entry = self._compile(button_text) if button_text else None
+            self.entries[user_id] = entry
+        return entry
+
+    async def get_text(self, user_id: int) -> str | None:
+        entry = await self.get(user_id)
+        return entry[0] if entry else None
+
+    async def set(self, user_id: int, button_text: str) -> bool:
+        entry = self._compile(button_text)
+        saved = await mongo_db.set_default_buttons(user_id, button_text)
+        if saved:
+            self.entries[user_id] = entry
+        else:
+            self.entries.pop(user_id, None)
+        return saved
+
+    async def delete(self, user_id: int) -> bool:
+        deleted = await mongo_db.delete_default_buttons(user_id)
+        if deleted:
+            self.entries[user_id] = None
+        else:
+            # Nothing deleted or the delete failed: reload from the database next time
+            self.entries.pop(user_id, None)
+        return deleted
+
+    async def build_keyboard(self, user_id: int, button_text: str):
+        """Preview keyboard for `button_text` followed by the user's default button rows.
+
+        Returns (keyboard, defaults_included).
+        """
+        keyboard = create_button_keyboard(button_text, for_preview=True)
+        entry = await self.get(user_id)
+        if entry:
+            keyboard.inline_keyboard.extend(build_button_rows(entry[1]))
+        return keyboard, entry is not None
+
+    @staticmethod
+    def _compile(button_text: str):
+        return button_text, compile_buttons(button_text)
+
+default_buttons = DefaultButtonsCache()
@@ -2,35 +2,58 @@
 # Channel  : https://t.me/NxMirror
 # Contact  : @FTKrshna
 
+import io
+import re
 from bot.logger import setup_logger
 from aiogram import types, Dispatcher
 from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters import Command
 from aiogram.dispatcher.filters.state import State, StatesGroup
-from aiogram.utils.exceptions import TelegramAPIError
-from config import DEFAULT_CHANNELS
+from aiogram.utils.exceptions import TelegramAPIError, NetworkError, RetryAfter
 from Scripts import FtKrshna
-from ..modules import mongo_db
+from ..modules import mongo_db, post_ledger, channel_registry, popup_store, idempotency_guard, idempotency_key
 from .keyboards import (
     create_channel_selection_keyboard,
     create_button_keyboard,
     create_confirm_keyboard,
     create_start_keyboard,
     create_default_buttons_keyboard,
-    create_my_channels_keyboard,
-    create_help_keyboard
+    create_help_keyboard,
+    create_broadcast_selection_keyboard,
+    create_quarantine_keyboard
 )
-from ..helpers import is_authorized, send_preview, send_to_channel
+from ..helpers import is_authorized, channel_cache, fan_out, send_preview, send_to_channel, stage_message, message_entities
+from .health import check_channel
+from .pagination import render_channel_page, SELECT_MODE, MY_CHANNELS_MODE
+from .default_buttons import default_buttons
+from .buttons import ButtonSyntaxError, POPUP_DATA_PREFIX, ALERT_DATA_PREFIX
+from .router import CallbackRouter, ANY_STATE
 from .broadcaster import (
     broadcast_command,
     BroadcastState,
+    BroadcastEditState,
     receive_broadcast_message,
     receive_broadcast_buttons,
-    handle_broadcast_confirmation
+    handle_broadcast_confirmation,
+    toggle_broadcast_tag,
+    edit_broadcast_command,
+    select_broadcast,
+    receive_broadcast_edit_content,
+    receive_broadcast_edit_buttons,
+    handle_broadcast_edit_confirmation,
+    RetractState,
+    retract_broadcast_command,
+    select_broadcast_to_retract,
+    handle_retract_confirmation
 )
 
 logger = setup_logger(__name__)
 
+TAG_PATTERN = re.compile(r"^[a-z0-9_-]{1,32}$")
+CHANNEL_ID_PATTERN = re.compile(r"-100\d+")
+IMPORT_CONCURRENCY = 10
+MAX_IMPORT_FILE_SIZE = 1024 * 1024
+
 class PostState(StatesGroup):
     WaitingForChannel = State()
     WaitingForMessage = State()
@@ -77,19 +100,23 @@ async def add_channel_command(message: types.Message):
         await message.reply("You are not authorized to use this command.")
         logger.warning(f"Unauthorized user {message.from_user.id} attempted /add")
         return
+    if message.document or len((message.text or "").split()) > 2:
+        await import_channels(message)
+        return
     try:
         args = message.text.split()
         if len(args) != 2 or not args[1].startswith("-100"):
-            await message.reply("Usage: /add -100xxxxxx")
+            await message.reply("Usage: /add -100xxxxxx [-100yyyyyy ...] or send a .txt/.csv file with /add as caption")
             logger.error(f"Invalid /add command format: {message.text}")
             return
         channel_id = int(args[1])
         chat = await message.bot.get_chat(channel_id)
+        channel_cache.put(channel_id, chat)
         if chat.type != "channel":
             await message.reply("The provided ID is not a channel.")
             logger.error(f"ID {channel_id} is not a channel")
             return
-        if await mongo_db.add_channel(channel_id, chat.title):
+        if await channel_registry.add(channel_id, chat.title):
             await message.reply(f"✅ Channel '{chat.title}' has been added to the database.")
         else:
             await message.reply(f"Channel '{chat.title}' already exists.")
@@ -103,6 +130,93 @@ async def add_channel_command(message: types.Message):
         await message.reply("An unexpected error occurred.")
         logger.error(f"Unexpected error in /add: {str(e)}")
 
+async def import_channels(message: types.Message):
+    """Validate many channel ids concurrently and save the valid ones with a single bulk write."""
+    try:
+        text = message.caption or message.text or ""
+        if message.document:
+            if message.document.file_size and message.document.file_size > MAX_IMPORT_FILE_SIZE:
+                await message.reply("File is too large. Please send at most 1 MB of channel IDs.")
+                return
+            buffer = io.BytesIO()
+            await message.document.download(destination_file=buffer)
+            text += "\n" + buffer.getvalue().decode("utf-8", errors="ignore")
+        channel_ids = list(dict.fromkeys(int(match) for match in CHANNEL_ID_PATTERN.findall(text)))
+        if not channel_ids:
+            await message.reply("No channel IDs found. IDs must start with -100.")
+            logger.error(f"No channel IDs found in import from user {message.from_user.id}")
+            return
+        logger.info(f"Importing {len(channel_ids)} channel(s) for user {message.from_user.id}")
+        status = await message.reply(f"Validating {len(channel_ids)} channel(s)...")
+
+        skipped = []
+
+        async def validate(channel_id):
+            try:
+                return await check_channel(message.bot, channel_id)
+            except (NetworkError, RetryAfter) as e:
+                # Flood control or a network error says nothing about the channel itself
+                skipped.append(channel_id)
+                logger.warning(f"Could not validate channel {channel_id}: {str(e)}")
+                return None
+
+        results, failed = await fan_out(channel_ids, validate, IMPORT_CONCURRENCY)
+        checked = {channel_id: result for channel_id, result in results.items() if result is not None}
+        valid = [(channel_id, title) for channel_id, (title, error) in checked.items() if not error]
+        invalid = failed + [(channel_id, error) for channel_id, (title, error) in checked.items() if error]
+        added = await channel_registry.add_many(valid)
+
+        response = (
+            f"Import finished: {len(added)} added, {len(valid) - len(added)} already saved, "
+            f"{len(invalid)} invalid (of {len(channel_ids)})."
+        )
+        if skipped:
+            response += f"\n{len(skipped)} channel(s) could not be checked right now, please import them again: " + " ".join(
+                str(channel_id) for channel_id in skipped[:50]
+            )
+        if invalid:
+            response += "\nInvalid channels:\n" + "\n".join(f"{ch[0]}: {ch[1]}" for ch in invalid[:50])
+            if len(invalid) > 50:
+                response += f"\n...and {len(invalid) - 50} more"
+        await status.edit_text(response)
+        logger.info(f"Imported {len(added)} channel(s) for user {message.from_user.id}, {len(invalid)} invalid")
+    except TelegramAPIError as e:
+        await message.reply(f"Error: {str(e)}")
+        logger.error(f"Telegram API error importing channels: {str(e)}")
+    except Exception as e:
+        await message.reply("An unexpected error occurred.")
+        logger.error(f"Unexpected error importing channels: {str(e)}")
+
+async def tag_channel_command(message: types.Message):
+    logger.info(f"Received {message.get_command()} from user {message.from_user.id}")
+    if not is_authorized(message.from_user.id):
+        await message.reply("You are not authorized to use this command.")
+        logger.warning(f"Unauthorized user {message.from_user.id} attempted {message.get_command()}")
+        return
+    command = message.get_command(pure=True)
+    try:
+        args = message.text.split()
+        tags = [tag.lower() for tag in args[2:]]
+        if len(args) < 3 or not args[1].startswith("-100") or not all(TAG_PATTERN.match(tag) for tag in tags):
+            await message.reply(f"Usage: /{command} -100xxxxxx tag1 tag2 ...\nTags may contain letters, digits, '_' and '-' (max 32 characters).")
+            logger.error(f"Invalid /{command} command format: {message.text}")
+            return
+        channel_id = int(args[1])
+        if command == "tag":
+            updated = await mongo_db.add_channel_tags(channel_id, tags)
+        else:
+            updated = await mongo_db.remove_channel_tags(channel_id, tags)
+        if updated:
+            await message.reply(f"✅ {'Tagged' if command == 'tag' else 'Untagged'} channel {channel_id}: {', '.join(tags)}")
+        else:
+            await message.reply("Channel not found in the database. Use /add first.")
+    except ValueError:
+        await message.reply("Invalid channel ID format.")
+        logger.error(f"Invalid channel ID format in /{command}: {message.text}")
+    except Exception as e:
+        await message.reply("An unexpected error occurred.")
+        logger.error(f"Unexpected error in /{command}: {str(e)}")
+
 async def set_default_buttons_command(message: types.Message, state: FSMContext, from_button=False, user_id=None):
     logger.info(f"Received /setdefaultbtns from user {user_id or message.from_user.id} (from_button={from_button})")
     effective_user_id = user_id or message.from_user.id
@@ -133,21 +247,23 @@ async def receive_default_buttons(message: types.Message, state: FSMContext):
     try:
         button_text = message.text.strip()
         if button_text.lower() == "none":
-            if await mongo_db.delete_default_buttons(message.from_user.id):
+            if await default_buttons.delete(message.from_user.id):
                 await message.reply("Default buttons cleared successfully.")
                 logger.info(f"Cleared default buttons for user {message.from_user.id}")
             else:
                 await message.reply("No default buttons were set.")
                 logger.info(f"No default buttons to clear for user {message.from_user.id}")
         else:
-            create_button_keyboard(button_text, for_preview=True)
-            if await mongo_db.set_default_buttons(message.from_user.id, button_text):
+            if await default_buttons.set(message.from_user.id, button_text):
                 await message.reply("Default buttons set successfully.")
                 logger.info(f"Set default buttons for user {message.from_user.id}")
             else:
                 await message.reply("Failed to set default buttons.")
                 logger.error(f"Failed to set default buttons for user {message.from_user.id}")
         await state.finish()
+    except ButtonSyntaxError as e:
+        await message.reply(f"Invalid button format at {e}. Fix it and send the buttons again, or send 'none'.")
+        logger.warning(f"Button syntax error in receive_default_buttons from user {message.from_user.id}: {str(e)}")
     except ValueError as e:
         await message.reply("Invalid button format. Please use the specified format or send 'none'.")
         logger.error(f"Invalid button format from user {message.from_user.id}: {str(e)}")
@@ -156,33 +272,6 @@ async def receive_default_buttons(message: types.Message, state: FSMContext):
         logger.error(f"Error in receive_default_buttons: {str(e)}")
         await state.finish()
 
-async def get_channels_for_selection(bot, for_my_channels=False):
-    db_channels = await mongo_db.get_channels()
-    channels = db_channels if db_channels else []
-    if not for_my_channels:
-        default_channels = []
-        try:
-            if DEFAULT_CHANNELS:
-                for channel_id in DEFAULT_CHANNELS:
-                    try:
-                        chat = await bot.get_chat(channel_id)
-                        if chat.type == "channel":
-                            default_channels.append({"channel_id": channel_id, "title": chat.title})
-                        else:
-                            logger.warning(f"Default channel ID {channel_id} is not a channel")
-                    except TelegramAPIError as e:
-                        logger.error(f"Error fetching default channel {channel_id}: {str(e)}")
-                channel_ids = {ch["channel_id"] for ch in channels}
-                for def_ch in default_channels:
-                    if def_ch["channel_id"] not in channel_ids:
-                        channels.append(def_ch)
-                logger.info(f"Combined channels: {len(channels)} (DB: {len(db_channels)}, Default: {len(default_channels)})")
-        except NameError:
-            logger.info("DEFAULT_CHANNELS not defined, using only database channels")
-    else:
-        logger.info(f"Returning only database channels for My Channels: {len(channels)}")
-    return channels
-
 async def my_channels_command(message: types.Message, state: FSMContext, from_button=False, user_id=None):
     logger.info(f"Received My Channels request from user {user_id or message.from_user.id} (from_button={from_button})")
     effective_user_id = user_id or message.from_user.id
@@ -190,15 +279,15 @@ async def my_channels_command(message: types.Message, state: FSMContext, from_bu
         await message.reply("You are not authorized to use this command.")
         logger.warning(f"Unauthorized user {effective_user_id} attempted My Channels")
         return
-    channels = await get_channels_for_selection(message.bot, for_my_channels=True)
-    if not channels:
+    keyboard, channel_count = await render_channel_page(message.bot, MY_CHANNELS_MODE)
+    if not channel_count:
         await message.reply("No channels saved in the database. Use /add to add a channel.")
         logger.info("No saved channels found for My Channels")
         return
     try:
         await message.reply(
             "Your saved channels:",
-            reply_markup=create_my_channels_keyboard(channels)
+            reply_markup=keyboard
         )
         logger.info(f"Sent My Channels keyboard to user {effective_user_id}")
     except Exception as e:
@@ -213,8 +302,8 @@ async def post_command(message: types.Message, state: FSMContext, from_button=Fa
         await message.reply("You are not authorized to use this command.")
         logger.warning(f"Unauthorized user {effective_user_id} attempted /post")
         return
-    channels = await get_channels_for_selection(message.bot)
-    if not channels:
+    keyboard, channel_count = await render_channel_page(message.bot, SELECT_MODE)
+    if not channel_count:
         await message.reply(FtKrshna.NO_CHANNELS_TEXT)
         logger.info("No channels found for /post")
         await state.finish()
@@ -222,7 +311,7 @@ async def post_command(message: types.Message, state: FSMContext, from_button=Fa
     try:
         await message.reply(
             "Please select a channel:",
-            reply_markup=create_channel_selection_keyboard(channels, show_back=False)
+            reply_markup=keyboard
         )
         await PostState.WaitingForChannel.set()
         await state.update_data(user_id=effective_user_id, flow="post")
@@ -240,8 +329,8 @@ async def edit_command(message: types.Message, state: FSMContext, from_button=Fa
         await message.reply("You are not authorized to use this command.")
         logger.warning(f"Unauthorized user {effective_user_id} attempted /edit")
         return
-    channels = await get_channels_for_selection(message.bot)
-    if not channels:
+    keyboard, channel_count = await render_channel_page(message.bot, SELECT_MODE)
+    if not channel_count:
         await message.reply(FtKrshna.NO_CHANNELS_TEXT)
         logger.info("No channels found for /edit")
         await state.finish()
@@ -249,7 +338,7 @@ async def edit_command(message: types.Message, state: FSMContext, from_button=Fa
     try:
         await message.reply(
             FtKrshna.SELECT_CHANNEL_TEXT,
-            reply_markup=create_channel_selection_keyboard(channels, show_back=False)
+            reply_markup=keyboard
         )
         await EditState.WaitingForChannel.set()
         await state.update_data(user_id=effective_user_id, flow="edit")
@@ -288,12 +377,28 @@ async def start_button_callback(callback_query: types.CallbackQuery, state: FSMC
                 from_button=True,
                 user_id=user_id
             )
+        elif callback_query.data == "start_edit_broadcast":
+            logger.debug(f"Triggering edit_broadcast_command for user {user_id}")
+            await edit_broadcast_command(
+                message=callback_query.message,
+                state=state,
+                from_button=True,
+                user_id=user_id
+            )
+        elif callback_query.data == "start_retract_broadcast":
+            logger.debug(f"Triggering retract_broadcast_command for user {user_id}")
+            await retract_broadcast_command(
+                message=callback_query.message,
+                state=state,
+                from_button=True,
+                user_id=user_id
+            )
         elif callback_query.data == "start_default_buttons":
             logger.debug(f"Showing default buttons keyboard for user {user_id}")
-            default_buttons = await mongo_db.get_default_buttons(user_id)
+            default_button_text = await default_buttons.get_text(user_id)
             message_text = "Manage your default buttons:"
-            if default_buttons:
-                message_text += f"\n\nCurrent default buttons:\n{default_buttons}"
+            if default_button_text:
+                message_text += f"\n\nCurrent default buttons:\n{default_button_text}"
             await callback_query.message.edit_text(
                 message_text,
                 reply_markup=create_default_buttons_keyboard()
@@ -346,12 +451,12 @@ async def my_channels_callback(callback_query: types.CallbackQuery, state: FSMCo
         if callback_query.data.startswith("delete_channel:"):
             _, channel_id = callback_query.data.split(":", 1)
             channel_id = int(channel_id)
-            if await mongo_db.remove_channel(channel_id):
-                channels = await get_channels_for_selection(callback_query.bot, for_my_channels=True)
-                if channels:
+            if await channel_registry.remove(channel_id):
+                keyboard, channel_count = await render_channel_page(callback_query.bot, MY_CHANNELS_MODE)
+                if channel_count:
                     await callback_query.message.edit_text(
                         "Channel deleted. Your saved channels:",
-                        reply_markup=create_my_channels_keyboard(channels)
+                        reply_markup=keyboard
                     )
                 else:
                     await callback_query.message.edit_text(
@@ -364,7 +469,7 @@ async def my_channels_callback(callback_query: types.CallbackQuery, state: FSMCo
                 logger.error(f"Failed to delete channel {channel_id} by user {user_id}")
             await callback_query.answer()
         elif callback_query.data == "clear_all_channels":
-            deleted_count = await mongo_db.clear_all_channels()
+            deleted_count = await channel_registry.clear()
             await callback_query.message.edit_text(
                 f"Cleared {deleted_count} channel(s). No saved channels left.",
                 reply_markup=create_start_keyboard()
@@ -373,6 +478,29 @@ async def my_channels_callback(callback_query: types.CallbackQuery, state: FSMCo
             await callback_query.answer()
         elif callback_query.data.startswith("view_channel:"):
             await callback_query.answer("Channel selected. No further action available.")
+        elif callback_query.data == "view_quarantine" or callback_query.data.startswith("release_channel:"):
+            if callback_query.data.startswith("release_channel:"):
+                channel_id = int(callback_query.data.split(":", 1)[1])
+                if await channel_registry.release(channel_id):
+                    logger.info(f"Released channel {channel_id} from quarantine by user {user_id}")
+                else:
+                    await callback_query.answer("Failed to release channel.")
+                    logger.error(f"Failed to release channel {channel_id} by user {user_id}")
+                    return
+            quarantined = channel_registry.get_quarantined()
+            if quarantined:
+                await callback_query.message.edit_text(
+                    "Quarantined channels (skipped by broadcasts after repeated delivery failures, re-checked automatically):",
+                    reply_markup=create_quarantine_keyboard(quarantined)
+                )
+            else:
+                keyboard, _ = await render_channel_page(callback_query.bot, MY_CHANNELS_MODE)
+                await callback_query.message.edit_text("No quarantined channels. Your saved channels:", reply_markup=keyboard)
+            await callback_query.answer()
+        elif callback_query.data == "back_to_my_channels":
+            keyboard, _ = await render_channel_page(callback_query.bot, MY_CHANNELS_MODE)
+            await callback_query.message.edit_text("Your saved channels:", reply_markup=keyboard)
+            await callback_query.answer()
         elif callback_query.data == "back_to_start":
             await callback_query.message.edit_text(
                 "Welcome! Use the buttons below to post, edit, broadcast, manage default buttons, or view your channels.",
@@ -392,6 +520,24 @@ async def my_channels_callback(callback_query: types.CallbackQuery, state: FSMCo
         logger.error(f"Unexpected error in my_channels_callback: {str(e)}")
         await callback_query.answer()
 
+async def channel_page_callback(callback_query: types.CallbackQuery, state: FSMContext):
+    logger.info(f"Received channel page callback from user {callback_query.from_user.id}: {callback_query.data}")
+    if not is_authorized(callback_query.from_user.id):
+        await callback_query.answer("You are not authorized.")
+        logger.warning(f"Unauthorized user {callback_query.from_user.id} attempted channel paging")
+        return
+    try:
+        _, mode, direction, cursor = callback_query.data.split(":", 3)
+        keyboard, _ = await render_channel_page(callback_query.bot, mode, direction, int(cursor))
+        await callback_query.message.edit_reply_markup(reply_markup=keyboard)
+        await callback_query.answer()
+    except ValueError as e:
+        await callback_query.answer("Invalid page.")
+        logger.error(f"ValueError in channel_page_callback: {str(e)}")
+    except TelegramAPIError as e:
+        await callback_query.answer("Error loading page.")
+        logger.error(f"TelegramAPIError in channel_page_callback: {str(e)}")
+
 async def default_buttons_callback(callback_query: types.CallbackQuery, state: FSMContext):
     user_id = callback_query.from_user.id
     logger.info(f"Received default buttons callback from user {user_id}: {callback_query.data}")
@@ -404,7 +550,7 @@ async def default_buttons_callback(callback_query: types.CallbackQuery, state: F
                 user_id=user_id
             )
         elif callback_query.data == "clear_default_buttons":
-            if await mongo_db.delete_default_buttons(user_id):
+            if await default_buttons.delete(user_id):
                 await callback_query.message.edit_text(
                     "Default buttons cleared successfully.",
                     reply_markup=create_default_buttons_keyboard()
@@ -429,6 +575,25 @@ async def default_buttons_callback(callback_query: types.CallbackQuery, state: F
         logger.error(f"Error in default_buttons_callback: {str(e)}")
         await callback_query.answer()
 
+async def apply_channel_selection(message: types.Message, state: FSMContext, channel_id: int, edit: bool = True):
+    """Store the chosen channel and move the post/edit flow to its next step."""
+    user_data = await state.get_data()
+    flow = user_data.get("flow")
+    await state.update_data(channel_id=channel_id)
+    send = message.edit_text if edit else message.reply
+    if flow == "post":
+        await send(
+            "Please send the message you want to post (text, media, or media with captions).",
+            reply_markup=create_channel_selection_keyboard([], show_back=False, show_close=True)
+        )
+        await PostState.WaitingForMessage.set()
+    elif flow == "edit":
+        await send(
+            "Please send the message ID of the channel post you want to edit. You can find it in the channel or in the bot logs.",
+            reply_markup=create_channel_selection_keyboard([], show_back=True, show_close=True)
+        )
+        await EditState.WaitingForMessageId.set()
+
 async def select_channel(callback_query: types.CallbackQuery, state: FSMContext):
     logger.info(f"Received select_channel callback from user {callback_query.from_user.id}: {callback_query.data}")
     if not is_authorized(callback_query.from_user.id):
@@ -443,21 +608,7 @@ async def select_channel(callback_query: types.CallbackQuery, state: FSMContext)
         _, channel_id = callback_query.data.split(":", 1)
         channel_id = int(channel_id)
         logger.info(f"User {callback_query.from_user.id} selected channel {channel_id}")
-        user_data = await state.get_data()
-        flow = user_data.get("flow")
-        await state.update_data(channel_id=channel_id)
-        if flow == "post":
-            await callback_query.message.edit_text(
-                "Please send the message you want to post (text, media, or media with captions).",
-                reply_markup=create_channel_selection_keyboard([], show_back=False, show_close=True)
-            )
-            await PostState.WaitingForMessage.set()
-        elif flow == "edit":
-            await callback_query.message.edit_text(
-                "Please send the message ID of the channel post you want to edit. You can find it in the channel or in the bot logs.",
-                reply_markup=create_channel_selection_keyboard([], show_back=True, show_close=True)
-            )
-            await EditState.WaitingForMessageId.set()
+        await apply_channel_selection(callback_query.message, state, channel_id)
         await callback_query.answer()
     except ValueError as e:
         await callback_query.answer("Invalid channel ID.")
@@ -470,6 +621,47 @@ async def select_channel(callback_query: types.CallbackQuery, state: FSMContext)
         logger.error(f"Unexpected error in select_channel: {str(e)}")
         await state.finish()
 
+async def inline_channel_search(inline_query: types.InlineQuery):
+    logger.info(f"Received inline channel search from user {inline_query.from_user.id}: {inline_query.query}")
+    if not is_authorized(inline_query.from_user.id):
+        await inline_query.answer([], cache_time=60, is_personal=True)
+        return
+    try:
+        channels = await channel_registry.search(inline_query.bot, inline_query.query)
+        results = [
+            types.InlineQueryResultArticle(
+                id=str(channel["channel_id"]),
+                title=channel["title"],
+                description=str(channel["channel_id"]),
+                input_message_content=types.InputTextMessageContent(f"#channel {channel['channel_id']}")
+            )
+            for channel in channels
+        ]
+        await inline_query.answer(results, cache_time=5, is_personal=True)
+    except TelegramAPIError as e:
+        logger.error(f"TelegramAPIError in inline_channel_search: {str(e)}")
+
+async def receive_searched_channel(message: types.Message, state: FSMContext):
+    user_data = await state.get_data()
+    if message.from_user.id != user_data.get("user_id"):
+        logger.warning(f"User mismatch: {message.from_user.id} != {user_data.get('user_id')}")
+        return
+    try:
+        channel_id = int(message.text.split()[1])
+        if not await channel_registry.is_known(channel_id):
+            await message.reply("Unknown channel. Please pick a channel from the list.")
+            logger.warning(f"User {message.from_user.id} picked unknown channel {channel_id} from inline search")
+            return
+        logger.info(f"User {message.from_user.id} picked channel {channel_id} from inline search")
+        await apply_channel_selection(message, state, channel_id, edit=False)
+    except (IndexError, ValueError):
+        await message.reply("Invalid channel selection. Please pick a channel from the list.")
+        logger.error(f"Invalid inline channel pick from user {message.from_user.id}: {message.text}")
+    except Exception as e:
+        await message.reply("An unexpected error occurred.")
+        logger.error(f"Unexpected error in receive_searched_channel: {str(e)}")
+        await state.finish()
+
 async def back_action(callback_query: types.CallbackQuery, state: FSMContext):
     logger.info(f"Received back_action callback from user {callback_query.from_user.id}")
     user_data = await state.get_data()
@@ -478,10 +670,10 @@ async def back_action(callback_query: types.CallbackQuery, state: FSMContext):
     try:
         if flow == "post":
             if current_state == PostState.WaitingForMessage.state:
-                channels = await get_channels_for_selection(callback_query.bot)
+                keyboard, _ = await render_channel_page(callback_query.bot, SELECT_MODE)
                 await callback_query.message.edit_text(
                     FtKrshna.SELECT_CHANNEL_TEXT,
-                    reply_markup=create_channel_selection_keyboard(channels)
+                    reply_markup=keyboard
                 )
                 await PostState.WaitingForChannel.set()
             elif current_state == PostState.WaitingForButtons.state:
@@ -499,10 +691,10 @@ async def back_action(callback_query: types.CallbackQuery, state: FSMContext):
                 await PostState.WaitingForButtons.set()
         elif flow == "edit":
             if current_state == EditState.WaitingForMessageId.state:
-                channels = await get_channels_for_selection(callback_query.bot)
+                keyboard, _ = await render_channel_page(callback_query.bot, SELECT_MODE)
                 await callback_query.message.edit_text(
                     FtKrshna.SELECT_CHANNEL_TEXT,
-                    reply_markup=create_channel_selection_keyboard(channels)
+                    reply_markup=keyboard
                 )
                 await EditState.WaitingForChannel.set()
             elif current_state == EditState.WaitingForContent.state:
@@ -538,6 +730,26 @@ async def back_action(callback_query: types.CallbackQuery, state: FSMContext):
                     reply_markup=create_channel_selection_keyboard([], show_back=True, show_close=True)
                 )
                 await BroadcastState.WaitingForButtons.set()
+        elif flow == "edit_broadcast":
+            if current_state == BroadcastEditState.WaitingForContent.state:
+                jobs = await mongo_db.get_recent_broadcast_jobs()
+                await callback_query.message.edit_text(
+                    "Please select the broadcast you want to edit:",
+                    reply_markup=create_broadcast_selection_keyboard(jobs)
+                )
+                await BroadcastEditState.WaitingForBroadcast.set()
+            elif current_state == BroadcastEditState.WaitingForButtons.state:
+                await callback_query.message.edit_text(
+                    "Send the new content (text, photo, video, or document) or type 'keep' to keep the existing content.",
+                    reply_markup=create_channel_selection_keyboard([], show_back=True, show_close=True)
+                )
+                await BroadcastEditState.WaitingForContent.set()
+            elif current_state == BroadcastEditState.WaitingForPreview.state:
+                await callback_query.message.edit_text(
+                    "Send the new buttons in the same format as before, 'keep' to keep the existing buttons, or 'none' to remove them.",
+                    reply_markup=create_channel_selection_keyboard([], show_back=True, show_close=True)
+                )
+                await BroadcastEditState.WaitingForButtons.set()
         elif current_state == DefaultButtonsState.WaitingForButtons.state:
             await callback_query.message.edit_text(
                 "Manage your default buttons:",
@@ -578,7 +790,7 @@ async def close_message(callback_query: types.CallbackQuery, state: FSMContext):
         logger.error(f"TelegramAPIError in close_message: {str(e)}")
         await state.finish()
 
-async def debug_callback(callback_query: types.CallbackQuery):
+async def debug_callback(callback_query: types.CallbackQuery, state: FSMContext):
     logger.info(f"DEBUG: Received callback query from user {callback_query.from_user.id}: {callback_query.data}")
     await callback_query.answer(f"Received callback: {callback_query.data}")
 
@@ -642,13 +854,13 @@ async def receive_post_message(message: types.Message, state: FSMContext):
         content["caption"] = caption
 
     try:
+        if not button_lines:
+            source = await stage_message(message.bot, message)
+            if source:
+                content["source"] = source
         if button_text:
-            default_buttons = await mongo_db.get_default_buttons(message.from_user.id)
-            combined_button_text = button_text
-            if default_buttons:
-                combined_button_text += "\n" + default_buttons
-            reply_markup = create_button_keyboard(combined_button_text, for_preview=True)
-            logger.info(f"Parsed buttons from Format= for user {message.from_user.id}, included default buttons: {default_buttons is not None}")
+            reply_markup, defaults_included = await default_buttons.build_keyboard(message.from_user.id, button_text)
+            logger.info(f"Parsed buttons from Format= for user {message.from_user.id}, included default buttons: {defaults_included}")
             preview_message = await send_preview(message.bot, content, reply_markup, message.chat.id)
             await state.update_data(
                 content=content,
@@ -668,6 +880,9 @@ async def receive_post_message(message: types.Message, state: FSMContext):
                 reply_markup=create_channel_selection_keyboard([], show_back=True, show_close=True)
             )
             await PostState.WaitingForButtons.set()
+    except ButtonSyntaxError as e:
+        await message.reply(f"Invalid button format at {e}. Fix the Format= buttons and send the message again.")
+        logger.warning(f"Button syntax error in receive_post_message from user {message.from_user.id}: {str(e)}")
     except Exception as e:
         await message.reply("Error processing message.")
         logger.error(f"Error in receive_post_message: {str(e)}")
@@ -741,6 +956,7 @@ async def receive_edit_content(message: types.Message, state: FSMContext):
                 logger.error(f"Unsupported content type from user {message.from_user.id}")
                 await state.finish()
                 return
+            content.update(message_entities(message))
             await state.update_data(content=content, keep_content=False)
         await message.reply(
             "Send the new buttons in the same format as before, or type 'keep' to keep the existing buttons.",
@@ -801,6 +1017,9 @@ async def receive_edit_buttons(message: types.Message, state: FSMContext):
             await message.reply("Invalid content or button format. Please try again or use /cancel.")
             logger.error(f"ValueError in receive_edit_buttons: {str(e)}")
             await state.finish()
+    except ButtonSyntaxError as e:
+        await message.reply(f"Invalid button format at {e}. Fix it and send the buttons again, or send 'keep' or 'none'.")
+        logger.warning(f"Button syntax error in receive_edit_buttons from user {message.from_user.id}: {str(e)}")
     except Exception as e:
         await message.reply("Error processing buttons. Please try again or use /cancel.")
         logger.error(f"Error in receive_edit_buttons: {str(e)}")
@@ -830,12 +1049,8 @@ async def receive_post_buttons(message: types.Message, state: FSMContext):
         if button_text.lower() == "none":
             logger.info(f"User {message.from_user.id} chose no buttons")
         else:
-            default_buttons = await mongo_db.get_default_buttons(message.from_user.id)
-            combined_button_text = button_text
-            if default_buttons:
-                combined_button_text += "\n" + default_buttons
-            reply_markup = create_button_keyboard(combined_button_text, for_preview=True)
-            logger.debug(f"Generated preview reply_markup for user {message.from_user.id}, default buttons included: {default_buttons is not None}")
+            reply_markup, defaults_included = await default_buttons.build_keyboard(message.from_user.id, button_text)
+            logger.debug(f"Generated preview reply_markup for user {message.from_user.id}, default buttons included: {defaults_included}")
         preview_message = await send_preview(message.bot, content, reply_markup, message.chat.id)
         await state.update_data(preview_message_id=preview_message.message_id, reply_markup=reply_markup)
         await message.reply(
@@ -848,6 +1063,9 @@ async def receive_post_buttons(message: types.Message, state: FSMContext):
         await message.reply(f"Error sending preview: {str(e)}")
         logger.error(f"TelegramAPIError in receive_post_buttons: {str(e)}")
         await state.finish()
+    except ButtonSyntaxError as e:
+        await message.reply(f"Invalid button format at {e}. Fix it and send the buttons again, or send 'none'.")
+        logger.warning(f"Button syntax error in receive_post_buttons from user {message.from_user.id}: {str(e)}")
     except ValueError as e:
         await message.reply("Invalid button format. Please use the specified format or send 'none'.")
         logger.error(f"ValueError in receive_post_buttons: {str(e)}")
@@ -871,6 +1089,10 @@ async def handle_edit_confirmation(callback_query: types.CallbackQuery, state: F
         edit_message_id = user_data.get("edit_message_id")
         preview_message_id = user_data.get("preview_message_id")
         if callback_query.data == "confirm_post":
+            if not await popup_store.flush():
+                await callback_query.answer("Could not save popup texts. Please tap Confirm again.")
+                logger.error(f"Popup texts not stored, edit of user {callback_query.from_user.id} not published")
+                return
             await send_to_channel(
                 callback_query.bot,
                 content=content,
@@ -879,6 +1101,7 @@ async def handle_edit_confirmation(callback_query: types.CallbackQuery, state: F
                 edit_message_id=edit_message_id,
                 keep_content=user_data.get("keep_content", False)
             )
+            post_ledger.record(channel_id, edit_message_id, content or None, reply_markup)
             await callback_query.message.reply("Post edited successfully!")
             logger.info(f"Edited post {edit_message_id} in channel {channel_id} by user {callback_query.from_user.id}")
         else:
@@ -916,7 +1139,17 @@ async def handle_preview_confirmation(callback_query: types.CallbackQuery, state
     preview_message_id = user_data.get("preview_message_id")
     try:
         if callback_query.data == "confirm_post":
-            await send_to_channel(callback_query.bot, content, reply_markup, channel_id)
+            if not await popup_store.flush():
+                await callback_query.answer("Could not save popup texts. Please tap Confirm again.")
+                logger.error(f"Popup texts not stored, post of user {callback_query.from_user.id} not published")
+                return
+            key = idempotency_key(callback_query.from_user.id, "post", preview_message_id, content, reply_markup, target=channel_id)
+            if not await idempotency_guard.claim(key):
+                await callback_query.answer("This post was already confirmed.")
+                logger.warning(f"Duplicate post confirmation from user {callback_query.from_user.id} for channel {channel_id}")
+                return
+            message = await send_to_channel(callback_query.bot, content, reply_markup, channel_id)
+            post_ledger.record(channel_id, message.message_id, content, reply_markup)
             await callback_query.message.reply("Message posted to the channel successfully!")
             logger.info(f"Posted message to channel {channel_id} by user {callback_query.from_user.id}")
         else:
@@ -938,10 +1171,19 @@ async def handle_preview_confirmation(callback_query: types.CallbackQuery, state
         logger.error(f"Unexpected error in handle_preview_confirmation: {str(e)}")
         await state.finish()
 
-async def button_callback(callback_query: types.CallbackQuery):
+async def button_callback(callback_query: types.CallbackQuery, state: FSMContext):
     logger.info(f"Received button callback from user {callback_query.from_user.id}: {callback_query.data}")
     try:
-        if callback_query.data.startswith(("popup:", "alert:")):
+        if callback_query.data.startswith((POPUP_DATA_PREFIX, ALERT_DATA_PREFIX)):
+            prefix, key = callback_query.data[:len(POPUP_DATA_PREFIX)], callback_query.data[len(POPUP_DATA_PREFIX):]
+            text = await popup_store.get(key)
+            if text is None:
+                await callback_query.answer("This button is no longer available.")
+                logger.warning(f"Unknown popup id {key} from user {callback_query.from_user.id}")
+                return
+            await callback_query.answer(text=text, show_alert=prefix == ALERT_DATA_PREFIX)
+            logger.info(f"Processed popup {key} for user {callback_query.from_user.id}")
+        elif callback_query.data.startswith(("popup:", "alert:")):
             action, text = callback_query.data.split(":", 1)
             if action == "popup":
                 await callback_query.answer(text=text, show_alert=False)
@@ -968,45 +1210,40 @@ async def fallback_handler(message: types.Message, state: FSMContext):
     )
     await message.reply("Unexpected input. Please continue with the current operation or use /cancel to reset.")
 
-def register_handlers(dp: Dispatcher):
-    logger.info("Registering handlers")
-    dp.register_message_handler(start_command, commands=["start"])
-    dp.register_message_handler(help_command, commands=["help"])
-    dp.register_message_handler(add_channel_command, commands=["add"])
-    dp.register_message_handler(post_command, commands=["post"])
-    dp.register_message_handler(edit_command, commands=["edit"])
-    dp.register_message_handler(broadcast_command, commands=["broadcast"])
-    dp.register_message_handler(set_default_buttons_command, commands=["setdefaultbtns"])
-    dp.register_message_handler(cancel_command, commands=["cancel"])
-    dp.register_callback_query_handler(
-        start_button_callback,
-        lambda c: c.data in [
+def build_callback_router() -> CallbackRouter:
+    router = CallbackRouter(fallback=debug_callback)
+    router.add(
+        [
             "start_post",
             "start_edit",
             "start_broadcast",
+            "start_edit_broadcast",
+            "start_retract_broadcast",
             "start_default_buttons",
             "start_my_channels",
             "start_help",
             "close_message",
             "back_to_start"
-        ]
-    )
-    dp.register_callback_query_handler(
-        default_buttons_callback,
-        lambda c: c.data in ["set_default_buttons", "clear_default_buttons", "back_to_start"]
-    )
-    dp.register_callback_query_handler(
-        my_channels_callback,
-        lambda c: c.data.startswith(("delete_channel:", "view_channel:")) or c.data in ["clear_all_channels", "back_to_start"]
+        ],
+        start_button_callback
     )
-    dp.register_callback_query_handler(
-        select_channel,
-        lambda c: c.data.startswith("select_channel:"),
-        state=[PostState.WaitingForChannel, EditState.WaitingForChannel]
+    router.add(["set_default_buttons", "clear_default_buttons"], default_buttons_callback)
+    router.add(
+        [
+            "delete_channel",
+            "view_channel",
+            "release_channel",
+            "clear_all_channels",
+            "view_quarantine",
+            "back_to_my_channels"
+        ],
+        my_channels_callback
     )
-    dp.register_callback_query_handler(
+    router.add("chpage", channel_page_callback, state=ANY_STATE)
+    router.add("select_channel", select_channel, state=[PostState.WaitingForChannel, EditState.WaitingForChannel])
+    router.add(
+        "back_action",
         back_action,
-        lambda c: c.data == "back_action",
         state=[
             PostState.WaitingForMessage,
             PostState.WaitingForButtons,
@@ -1018,20 +1255,53 @@ def register_handlers(dp: Dispatcher):
             BroadcastState.WaitingForMessage,
             BroadcastState.WaitingForButtons,
             BroadcastState.WaitingForPreview,
+            BroadcastEditState.WaitingForContent,
+            BroadcastEditState.WaitingForButtons,
+            BroadcastEditState.WaitingForPreview,
             DefaultButtonsState.WaitingForButtons
         ]
     )
-    dp.register_callback_query_handler(
-        cancel_action,
-        lambda c: c.data == "cancel_action",
-        state="*"
+    router.add("select_broadcast", select_broadcast, state=BroadcastEditState.WaitingForBroadcast)
+    router.add("retract_broadcast", select_broadcast_to_retract, state=RetractState.WaitingForBroadcast)
+    router.add("broadcast_tag", toggle_broadcast_tag, state=BroadcastState.WaitingForPreview)
+    router.add(["confirm_post", "cancel_action"], handle_preview_confirmation, state=PostState.WaitingForPreview)
+    router.add(["confirm_post", "cancel_action"], handle_edit_confirmation, state=EditState.WaitingForPreview)
+    router.add(["confirm_post", "cancel_action"], handle_broadcast_confirmation, state=BroadcastState.WaitingForPreview)
+    router.add(["confirm_post", "cancel_action"], handle_broadcast_edit_confirmation, state=BroadcastEditState.WaitingForPreview)
+    router.add(["confirm_post", "cancel_action"], handle_retract_confirmation, state=RetractState.WaitingForConfirmation)
+    router.add("cancel_action", cancel_action, state=ANY_STATE)
+    router.add("close_message", close_message, state=ANY_STATE)
+    router.add(
+        ["popup", "alert", POPUP_DATA_PREFIX.rstrip(":"), ALERT_DATA_PREFIX.rstrip(":")],
+        button_callback,
+        state=ANY_STATE
+    )
+    return router
+
+def register_handlers(dp: Dispatcher):
+    logger.info("Registering handlers")
+    dp.register_message_handler(start_command, commands=["start"])
+    dp.register_message_handler(help_command, commands=["help"])
+    dp.register_message_handler(
+        add_channel_command,
+        commands=["add"],
+        commands_ignore_caption=False,
+        content_types=[types.ContentType.TEXT, types.ContentType.DOCUMENT]
     )
-    dp.register_callback_query_handler(
-        close_message,
-        lambda c: c.data == "close_message",
-        state="*"
+    dp.register_message_handler(tag_channel_command, commands=["tag", "untag"])
+    dp.register_message_handler(post_command, commands=["post"])
+    dp.register_message_handler(edit_command, commands=["edit"])
+    dp.register_message_handler(broadcast_command, commands=["broadcast"])
+    dp.register_message_handler(edit_broadcast_command, commands=["editbroadcast"])
+    dp.register_message_handler(retract_broadcast_command, commands=["retractbroadcast"])
+    dp.register_message_handler(set_default_buttons_command, commands=["setdefaultbtns"])
+    dp.register_message_handler(cancel_command, commands=["cancel"])
+    dp.register_inline_handler(inline_channel_search, state="*")
+    dp.register_message_handler(
+        receive_searched_channel,
+        regexp=r"^#channel -?\d+$",
+        state=[PostState.WaitingForChannel, EditState.WaitingForChannel]
     )
-    dp.register_callback_query_handler(debug_callback)
     dp.register_message_handler(
         receive_post_message,
         content_types=[
@@ -1078,28 +1348,25 @@ def register_handlers(dp: Dispatcher):
         content_types=[types.ContentType.TEXT],
         state=BroadcastState.WaitingForButtons
     )
+    dp.register_message_handler(
+        receive_broadcast_edit_content,
+        content_types=[
+            types.ContentType.TEXT,
+            types.ContentType.PHOTO,
+            types.ContentType.VIDEO,
+            types.ContentType.DOCUMENT
+        ],
+        state=BroadcastEditState.WaitingForContent
+    )
+    dp.register_message_handler(
+        receive_broadcast_edit_buttons,
+        content_types=[types.ContentType.TEXT],
+        state=BroadcastEditState.WaitingForButtons
+    )
     dp.register_message_handler(
         receive_default_buttons,
         content_types=[types.ContentType.TEXT],
         state=DefaultButtonsState.WaitingForButtons
     )
-    dp.register_callback_query_handler(
-        handle_preview_confirmation,
-        lambda c: c.data in ["confirm_post", "cancel_action"],
-        state=PostState.WaitingForPreview
-    )
-    dp.register_callback_query_handler(
-        handle_edit_confirmation,
-        lambda c: c.data in ["confirm_post", "cancel_action"],
-        state=EditState.WaitingForPreview
-    )
-    dp.register_callback_query_handler(
-        handle_broadcast_confirmation,
-        lambda c: c.data in ["confirm_post", "cancel_action"],
-        state=BroadcastState.WaitingForPreview
-    )
-    dp.register_callback_query_handler(
-        button_callback,
-        lambda c: c.data.startswith(("popup:", "alert:"))
-    )
+    build_callback_router().register(dp)
     dp.register_message_handler(fallback_handler)
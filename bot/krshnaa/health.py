@@ -0,0 +1,108 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import asyncio
+from datetime import datetime, timezone
+from aiogram.utils.exceptions import (
+    TelegramAPIError, NetworkError, RetryAfter, ChatNotFound, Unauthorized,
+    NeedAdministratorRightsInTheChannel, GroupDeactivated
+)
+from bot.logger import setup_logger
+from ..helpers import channel_cache, fan_out
+from ..helpers.ratelimit import TokenBucket
+from ..modules import mongo_db, channel_registry
+from config import CHANNEL_HEALTH_INTERVAL, CHANNEL_HEALTH_RATE
+
+logger = setup_logger(__name__)
+
+HEALTH_CONCURRENCY = 4
+PROBE_INTERVAL = 300
+
+# Delivery errors that will not go away on retry; repeated ones get a channel quarantined
+PERMANENT_ERRORS = (ChatNotFound, Unauthorized, NeedAdministratorRightsInTheChannel, GroupDeactivated)
+
+async def check_channel(bot, channel_id: int):
+    """Return (title, error) for a channel: error is None when the bot can post there."""
+    chat = await bot.get_chat(channel_id)
+    channel_cache.put(channel_id, chat)
+    if chat.type != "channel":
+        return chat.title, "not a channel"
+    member = await bot.get_chat_member(channel_id, bot.id)
+    if member.status != "creator" and not (member.status == "administrator" and member.can_post_messages):
+        return chat.title, "bot is not an admin with posting rights"
+    return chat.title, None
+
+async def run_channel_health_check(bot) -> dict:
+    """Re-validate every saved channel at CHANNEL_HEALTH_RATE checks per second and store the results in one bulk write."""
+    channels = await channel_registry.get_channels(bot, include_defaults=False)
+    bucket = TokenBucket(CHANNEL_HEALTH_RATE, 1)
+    loop = asyncio.get_running_loop()
+    checked_at = datetime.now(timezone.utc)
+    updates = []
+
+    async def check(channel_id):
+        delay = bucket.reserve(loop.time())
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            title, error = await check_channel(bot, channel_id)
+        except (NetworkError, RetryAfter):
+            raise
+        except TelegramAPIError as e:
+            title, error = None, str(e)
+        updates.append({"channel_id": channel_id, "title": title, "error": error, "checked_at": checked_at})
+
+    _, transient = await fan_out([ch["channel_id"] for ch in channels], check, HEALTH_CONCURRENCY)
+    await mongo_db.apply_channel_health(updates)
+    channel_registry.apply_health(updates)
+    unreachable = sum(1 for update in updates if update["error"])
+    logger.info(f"Channel health check: {len(updates)} checked, {unreachable} unreachable, {len(transient)} skipped on transient errors")
+    return {"checked": len(updates), "unreachable": unreachable, "skipped": len(transient)}
+
+async def channel_health_loop(bot, interval: int = CHANNEL_HEALTH_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_channel_health_check(bot)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Channel health check failed: {str(e)}")
+
+async def probe_quarantined_channels(bot) -> dict:
+    """Re-check quarantined channels whose backoff has elapsed: release those the bot can post to again, push the rest back."""
+    channels = await mongo_db.get_channels_due_for_probe()
+    bucket = TokenBucket(CHANNEL_HEALTH_RATE, 1)
+    loop = asyncio.get_running_loop()
+    released = 0
+    for channel in channels:
+        delay = bucket.reserve(loop.time())
+        if delay > 0:
+            await asyncio.sleep(delay)
+        channel_id = channel["channel_id"]
+        try:
+            _, error = await check_channel(bot, channel_id)
+        except (NetworkError, RetryAfter) as e:
+            logger.warning(f"Probe of quarantined channel {channel_id} hit a transient error, will retry: {str(e)}")
+            continue
+        except TelegramAPIError as e:
+            error = str(e)
+        if error is None and await channel_registry.release(channel_id):
+            released += 1
+            logger.info(f"Released channel {channel_id} from quarantine")
+        else:
+            await mongo_db.postpone_probe(channel_id, channel.get("probe_attempts", 0) + 1)
+    if channels:
+        logger.info(f"Quarantine probe: {len(channels)} checked, {released} released")
+    return {"checked": len(channels), "released": released}
+
+async def quarantine_probe_loop(bot, interval: int = PROBE_INTERVAL):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await probe_quarantined_channels(bot)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Quarantine probe failed: {str(e)}")
@@ -5,6 +5,7 @@
 from bot.logger import setup_logger
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from Scripts import Labels  
+from .buttons import compile_buttons, build_button_rows
 
 logger = setup_logger(__name__)
 
@@ -18,6 +19,10 @@ def create_start_keyboard():
         InlineKeyboardButton(Labels.BROADCAST, callback_data="start_broadcast"),
         InlineKeyboardButton(Labels.HELP, callback_data="start_help")
     )
+    keyboard.add(
+        InlineKeyboardButton(Labels.EDIT_BROADCAST, callback_data="start_edit_broadcast"),
+        InlineKeyboardButton(Labels.RETRACT_BROADCAST, callback_data="start_retract_broadcast")
+    )
     keyboard.add(
         InlineKeyboardButton(Labels.DEFAULT_BUTTONS, callback_data="start_default_buttons"),
         InlineKeyboardButton(Labels.MY_CHANNELS, callback_data="start_my_channels")
@@ -41,7 +46,15 @@ def create_default_buttons_keyboard():
     logger.debug("Created default buttons keyboard")
     return keyboard
 
-def create_my_channels_keyboard(channels):
+def create_page_navigation_row(prev_data=None, next_data=None):
+    buttons = []
+    if prev_data:
+        buttons.append(InlineKeyboardButton("« Prev", callback_data=prev_data))
+    if next_data:
+        buttons.append(InlineKeyboardButton("Next »", callback_data=next_data))
+    return buttons
+
+def create_my_channels_keyboard(channels, prev_data=None, next_data=None, quarantined_count=0):
     keyboard = InlineKeyboardMarkup(row_width=2)
     for index, channel in enumerate(channels, start=1):
         keyboard.add(
@@ -54,6 +67,11 @@ def create_my_channels_keyboard(channels):
                 callback_data=f"delete_channel:{channel['channel_id']}"
             )
         )
+    navigation = create_page_navigation_row(prev_data, next_data)
+    if navigation:
+        keyboard.row(*navigation)
+    if quarantined_count:
+        keyboard.row(InlineKeyboardButton(f"Quarantined ({quarantined_count})", callback_data="view_quarantine"))
     keyboard.row(
         InlineKeyboardButton("Clear All", callback_data="clear_all_channels"),
         InlineKeyboardButton("Back", callback_data="back_to_start"),
@@ -62,8 +80,30 @@ def create_my_channels_keyboard(channels):
     logger.debug(f"Created my channels keyboard with {len(channels)} channels")
     return keyboard
 
-def create_channel_selection_keyboard(channels, show_back=False, show_close=True):
+def create_quarantine_keyboard(channels):
+    keyboard = InlineKeyboardMarkup(row_width=2)
+    for channel in channels:
+        keyboard.add(
+            InlineKeyboardButton(
+                channel["title"],
+                callback_data=f"view_channel:{channel['channel_id']}"
+            ),
+            InlineKeyboardButton(
+                "Release",
+                callback_data=f"release_channel:{channel['channel_id']}"
+            )
+        )
+    keyboard.row(
+        InlineKeyboardButton("Back", callback_data="back_to_my_channels"),
+        InlineKeyboardButton("Close", callback_data="close_message")
+    )
+    logger.debug(f"Created quarantine keyboard with {len(channels)} channels")
+    return keyboard
+
+def create_channel_selection_keyboard(channels, show_back=False, show_close=True, prev_data=None, next_data=None, show_search=False):
     keyboard = InlineKeyboardMarkup(row_width=1)
+    if show_search:
+        keyboard.add(InlineKeyboardButton("🔍 Search channels", switch_inline_query_current_chat=""))
     for channel in channels:
         keyboard.add(
             InlineKeyboardButton(
@@ -71,6 +111,9 @@ def create_channel_selection_keyboard(channels, show_back=False, show_close=True
                 callback_data=f"select_channel:{channel['channel_id']}"
             )
         )
+    navigation = create_page_navigation_row(prev_data, next_data)
+    if navigation:
+        keyboard.row(*navigation)
     buttons = [InlineKeyboardButton("Cancel", callback_data="cancel_action")]
     if show_back:
         buttons.append(InlineKeyboardButton("Back", callback_data="back_action"))
@@ -80,32 +123,27 @@ def create_channel_selection_keyboard(channels, show_back=False, show_close=True
     logger.debug(f"Created channel selection keyboard with {len(channels)} channels")
     return keyboard
 
+def create_broadcast_selection_keyboard(jobs, action="select_broadcast"):
+    keyboard = InlineKeyboardMarkup(row_width=1)
+    for job in jobs:
+        content = job.get("content") or {}
+        snippet = (content.get("text") or content.get("caption") or content.get("type", "")).replace("\n", " ")[:30]
+        keyboard.add(
+            InlineKeyboardButton(
+                f"{job['created_at']:%d %b %H:%M} · {job['total']} ch · {snippet}",
+                callback_data=f"{action}:{job['_id']}"
+            )
+        )
+    keyboard.row(
+        InlineKeyboardButton("Cancel", callback_data="cancel_action"),
+        InlineKeyboardButton("Close", callback_data="close_message")
+    )
+    logger.debug(f"Created broadcast selection keyboard with {len(jobs)} broadcasts")
+    return keyboard
+
 def create_button_keyboard(button_text: str, for_preview: bool = False) -> InlineKeyboardMarkup:
-    keyboard = InlineKeyboardMarkup()
-    rows = button_text.strip().split("\n")
-    for row in rows:
-        buttons = []
-        button_pairs = row.split("&&")
-        for pair in button_pairs:
-            try:
-                text, action = pair.split("-", 1)
-                text = text.strip()
-                action = action.strip()
-                if action.startswith(("http://", "https://", "t.me/")):
-                    buttons.append(InlineKeyboardButton(text, url=action))
-                elif action.startswith("popup:"):
-                    buttons.append(InlineKeyboardButton(text, callback_data=action))
-                elif action.startswith("alert:"):
-                    buttons.append(InlineKeyboardButton(text, callback_data=action))
-                elif action.startswith("share:"):
-                    buttons.append(InlineKeyboardButton(text, switch_inline_query=action[6:].strip()))
-                else:
-                    logger.warning(f"Invalid button action: {action}")
-            except ValueError:
-                logger.error(f"Invalid button format: {pair}")
-                continue
-        if buttons:
-            keyboard.row(*buttons)
+    """Build a keyboard from button markup; raises ButtonSyntaxError (a ValueError) on malformed input."""
+    keyboard = InlineKeyboardMarkup(inline_keyboard=build_button_rows(compile_buttons(button_text)))
     if not for_preview:
         keyboard.row(
             InlineKeyboardButton("Cancel", callback_data="cancel_action"),
@@ -125,6 +163,23 @@ def create_confirm_keyboard():
     logger.debug("Created confirm keyboard")
     return keyboard
 
+def create_broadcast_target_keyboard(tags, selected):
+    keyboard = InlineKeyboardMarkup(row_width=2)
+    keyboard.add(*[
+        InlineKeyboardButton(
+            f"{'✅' if tag in selected else '🏷️'} {tag}",
+            callback_data=f"broadcast_tag:{tag}"
+        )
+        for tag in tags
+    ])
+    keyboard.add(
+        InlineKeyboardButton("Confirm", callback_data="confirm_post"),
+        InlineKeyboardButton("Cancel", callback_data="cancel_action")
+    )
+    keyboard.add(InlineKeyboardButton("Close", callback_data="close_message"))
+    logger.debug(f"Created broadcast target keyboard with {len(tags)} tags, selected={selected}")
+    return keyboard
+
 def create_help_keyboard():
     keyboard = InlineKeyboardMarkup(row_width=1)
     keyboard.add(
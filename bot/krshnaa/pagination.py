@@ -0,0 +1,45 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+from collections import OrderedDict
+from bot.logger import setup_logger
+from ..modules import channel_registry
+from .keyboards import create_channel_selection_keyboard, create_my_channels_keyboard
+
+logger = setup_logger(__name__)
+
+PAGE_CACHE_SIZE = 128
+SELECT_MODE = "sel"
+MY_CHANNELS_MODE = "my"
+
+_page_cache = OrderedDict()
+
+async def render_channel_page(bot, mode: str, direction: str = None, cursor: int = None):
+    """Return (keyboard, channel_count) for one page of a channel picker.
+
+    `direction` is "a" (after `cursor`) or "b" (before `cursor`); rendered pages are cached until the registry changes.
+    """
+    include_defaults = mode == SELECT_MODE
+    channels, has_prev, has_next = await channel_registry.get_page(
+        bot,
+        after=cursor if direction == "a" else None,
+        before=cursor if direction == "b" else None,
+        include_defaults=include_defaults
+    )
+    quarantined_count = len(channel_registry.quarantined) if mode == MY_CHANNELS_MODE else 0
+    key = (mode, channel_registry.version, tuple(ch["channel_id"] for ch in channels), has_prev, has_next, quarantined_count)
+    keyboard = _page_cache.get(key)
+    if keyboard is not None:
+        _page_cache.move_to_end(key)
+        return keyboard, len(channels)
+    prev_data = f"chpage:{mode}:b:{channels[0]['channel_id']}" if has_prev else None
+    next_data = f"chpage:{mode}:a:{channels[-1]['channel_id']}" if has_next else None
+    if mode == MY_CHANNELS_MODE:
+        keyboard = create_my_channels_keyboard(channels, prev_data=prev_data, next_data=next_data, quarantined_count=quarantined_count)
+    else:
+        keyboard = create_channel_selection_keyboard(channels, prev_data=prev_data, next_data=next_data, show_search=has_prev or has_next)
+    _page_cache[key] = keyboard
+    if len(_page_cache) > PAGE_CACHE_SIZE:
+        _page_cache.popitem(last=False)
+    return keyboard, len(channels)
@@ -0,0 +1,54 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+from aiogram import types
+from aiogram.dispatcher import FSMContext
+from aiogram.dispatcher.filters.state import State
+from bot.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ANY_STATE = "*"
+
+def callback_action(data: str) -> str:
+    """Routing key of callback data: the part before the first ":" (`delete_channel:-100…` -> `delete_channel`)."""
+    return data.partition(":")[0]
+
+class CallbackRouter:
+    """Dispatches callback queries with one dict lookup on the action and one on the FSM state.
+
+    `state=None` matches only users without a state, `state="*"` matches any state, and a State or list of
+    States matches exactly those. A handler bound to the current state wins over the "*" handler.
+    """
+
+    def __init__(self, fallback=None):
+        self.routes = {}
+        self.fallback = fallback
+
+    def add(self, actions, handler, state=None):
+        states = state if isinstance(state, (list, tuple)) else [state]
+        for action in [actions] if isinstance(actions, str) else actions:
+            by_state = self.routes.setdefault(action, {})
+            for entry in states:
+                key = entry.state if isinstance(entry, State) else entry
+                if key in by_state:
+                    raise ValueError(f"Callback action {action!r} in state {key!r} is already routed to {by_state[key].__name__}")
+                by_state[key] = handler
+
+    def resolve(self, data: str, current_state: str | None):
+        by_state = self.routes.get(callback_action(data))
+        if not by_state:
+            return self.fallback
+        return by_state.get(current_state) or by_state.get(ANY_STATE) or self.fallback
+
+    async def dispatch(self, callback_query: types.CallbackQuery, state: FSMContext):
+        handler = self.resolve(callback_query.data or "", await state.get_state())
+        if handler is None:
+            await callback_query.answer()
+            return
+        await handler(callback_query, state)
+
+    def register(self, dp):
+        dp.register_callback_query_handler(self.dispatch, state=ANY_STATE)
+        logger.info(f"Registered callback router with {len(self.routes)} actions")
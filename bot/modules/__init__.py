@@ -1,3 +1,7 @@
 from .mongo import mongo_db
+from .ledger import post_ledger
+from .registry import channel_registry
+from .popups import popup_store
+from .idempotency import idempotency_guard, idempotency_key
 
-__all__ = ["mongo_db"]
+__all__ = ["mongo_db", "post_ledger", "channel_registry", "popup_store", "idempotency_guard", "idempotency_key"]
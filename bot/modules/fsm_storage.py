@@ -0,0 +1,169 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import asyncio
+import copy
+import time
+import typing
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from aiogram.dispatcher.storage import BaseStorage
+from bot.logger import setup_logger
+from config import FSM_SESSION_TTL, FSM_CACHE_SIZE
+from .mongo import mongo_db
+from .session import Session
+
+logger = setup_logger(__name__)
+
+SWEEP_INTERVAL = 300
+
+class _Entry:
+    __slots__ = ("state", "session", "bucket", "touched")
+
+    def __init__(self, state=None, session=None, bucket=None):
+        self.state = state
+        self.session = session or Session()
+        self.bucket = bucket or {}
+        self.touched = time.monotonic()
+
+    def is_empty(self) -> bool:
+        return self.state is None and self.session.is_empty() and not self.bucket
+
+class MongoFSMStorage(BaseStorage):
+    """FSM storage persisted in the fsm_sessions collection, fronted by a write-through LRU of compact Sessions.
+
+    Sessions idle for longer than `ttl` seconds expire: MongoDB drops them through a TTL index and a
+    background sweeper evicts them from the cache, so memory stays bounded and sessions survive restarts.
+    """
+
+    def __init__(self, ttl: int = FSM_SESSION_TTL, cache_size: int = FSM_CACHE_SIZE):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.sweeper = None
+
+    def _key(self, chat, user) -> str:
+        chat, user = self.check_address(chat=chat, user=user)
+        return f"{chat}:{user}"
+
+    def _remember(self, key: str, entry: _Entry) -> _Entry:
+        self.cache[key] = entry
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return entry
+
+    async def _load(self, chat, user) -> tuple:
+        key = self._key(chat, user)
+        entry = self.cache.get(key)
+        if entry is not None and time.monotonic() - entry.touched <= self.ttl:
+            self.cache.move_to_end(key)
+            return key, entry
+        doc = await mongo_db.get_fsm_session(key)
+        if doc and not self._expired(doc) and isinstance(doc.get("data"), str):
+            entry = _Entry(doc.get("state"), Session.from_json(doc["data"]), doc.get("bucket") or {})
+        else:
+            # Sessions saved in the older dict format are dropped whole: a state without its data strands the user
+            entry = _Entry()
+        return key, self._remember(key, entry)
+
+    def _expired(self, doc: dict) -> bool:
+        """MongoDB's TTL monitor runs about once a minute, so idle documents may still be around briefly."""
+        updated_at = doc.get("updated_at")
+        if updated_at is None:
+            return False
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - updated_at > timedelta(seconds=self.ttl)
+
+    async def _save(self, key: str, entry: _Entry):
+        entry.touched = time.monotonic()
+        if entry.is_empty():
+            await mongo_db.delete_fsm_session(key)
+        else:
+            await mongo_db.save_fsm_session(key, entry.state, entry.session.to_json(), entry.bucket)
+
+    async def get_state(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                        default: typing.Optional[str] = None) -> typing.Optional[str]:
+        _, entry = await self._load(chat, user)
+        return entry.state if entry.state is not None else self.resolve_state(default)
+
+    async def get_data(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                       default: typing.Optional[dict] = None) -> typing.Dict:
+        _, entry = await self._load(chat, user)
+        return entry.session.to_data()
+
+    async def set_state(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                        state: typing.AnyStr = None):
+        key, entry = await self._load(chat, user)
+        entry.state = self.resolve_state(state)
+        await self._save(key, entry)
+
+    async def set_data(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                       data: typing.Dict = None):
+        key, entry = await self._load(chat, user)
+        entry.session = Session.from_data(data)
+        await self._save(key, entry)
+
+    async def update_data(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                          data: typing.Dict = None, **kwargs):
+        key, entry = await self._load(chat, user)
+        entry.session.update({**(data or {}), **kwargs})
+        await self._save(key, entry)
+
+    async def reset_state(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                          with_data: typing.Optional[bool] = True):
+        key, entry = await self._load(chat, user)
+        entry.state = None
+        if with_data:
+            entry.session = Session()
+        await self._save(key, entry)
+
+    def has_bucket(self):
+        return True
+
+    async def get_bucket(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                         default: typing.Optional[dict] = None) -> typing.Dict:
+        _, entry = await self._load(chat, user)
+        return copy.deepcopy(entry.bucket)
+
+    async def set_bucket(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                         bucket: typing.Dict = None):
+        key, entry = await self._load(chat, user)
+        entry.bucket = copy.deepcopy(bucket) if bucket else {}
+        await self._save(key, entry)
+
+    async def update_bucket(self, *, chat: typing.Union[str, int, None] = None, user: typing.Union[str, int, None] = None,
+                            bucket: typing.Dict = None, **kwargs):
+        key, entry = await self._load(chat, user)
+        entry.bucket.update(bucket or {}, **kwargs)
+        await self._save(key, entry)
+
+    def sweep(self) -> int:
+        """Evict cached sessions idle for longer than the TTL; their documents expire through the TTL index."""
+        deadline = time.monotonic() - self.ttl
+        expired = [key for key, entry in self.cache.items() if entry.touched < deadline]
+        for key in expired:
+            del self.cache[key]
+        if expired:
+            logger.info(f"Evicted {len(expired)} idle FSM session(s)")
+        return len(expired)
+
+    async def _sweep_loop(self, interval: int):
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def start_sweeper(self, interval: int = SWEEP_INTERVAL):
+        if self.sweeper is None:
+            self.sweeper = asyncio.create_task(self._sweep_loop(interval))
+
+    async def close(self):
+        if self.sweeper is not None:
+            self.sweeper.cancel()
+            self.sweeper = None
+        self.cache.clear()
+
+    async def wait_closed(self):
+        pass
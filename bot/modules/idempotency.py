@@ -0,0 +1,47 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import hashlib
+import json
+from collections import OrderedDict
+from bot.logger import setup_logger
+from .ledger import content_hash, buttons_hash
+from .mongo import mongo_db
+
+logger = setup_logger(__name__)
+
+CACHE_SIZE = 4096
+
+def idempotency_key(user_id: int, flow: str, preview_message_id: int | None, content: dict | None, reply_markup, target=None) -> str:
+    """Key of one confirmation: the session (user, flow, preview message, target) plus the content and buttons hashes."""
+    parts = [user_id, flow, preview_message_id, target, content_hash(content), buttons_hash(reply_markup)]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+class IdempotencyGuard:
+    """Rejects repeated confirmations: recent keys are answered from an in-process LRU, older ones by the
+    TTL-indexed idempotency_keys collection, which also covers retries after a restart."""
+
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.cache_size = cache_size
+        self.seen = OrderedDict()
+
+    def _remember(self, key: str):
+        self.seen[key] = None
+        self.seen.move_to_end(key)
+        if len(self.seen) > self.cache_size:
+            self.seen.popitem(last=False)
+
+    async def claim(self, key: str) -> bool:
+        """True the first time a key is seen; False for every repeat."""
+        if key in self.seen:
+            self.seen.move_to_end(key)
+            logger.warning(f"Rejected duplicate confirmation {key[:12]}")
+            return False
+        self._remember(key)
+        claimed = await mongo_db.claim_idempotency_key(key)
+        if not claimed:
+            logger.warning(f"Rejected duplicate confirmation {key[:12]} (already recorded)")
+        return claimed
+
+idempotency_guard = IdempotencyGuard()
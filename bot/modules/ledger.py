@@ -0,0 +1,110 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timezone
+from bot.logger import setup_logger
+from .mongo import mongo_db
+
+logger = setup_logger(__name__)
+
+BATCH_SIZE = 100
+FLUSH_DELAY = 1.0
+# Records kept while the database is unavailable; the oldest are dropped beyond this
+MAX_BUFFER = 10000
+MAX_RETRY_DELAY = 60.0
+
+def content_hash(content: dict | None) -> str | None:
+    if not content:
+        return None
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+def buttons_hash(reply_markup) -> str | None:
+    if not reply_markup:
+        return None
+    return hashlib.sha256(json.dumps(reply_markup.to_python(), sort_keys=True).encode()).hexdigest()
+
+class PostLedger:
+    """Buffers delivery records and writes them to the posts collection in batches.
+
+    Failed writes are retried with exponential backoff; while they fail the buffer holds at most `max_buffer` records.
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE, flush_delay: float = FLUSH_DELAY, max_buffer: int = MAX_BUFFER):
+        self.batch_size = batch_size
+        self.flush_delay = flush_delay
+        self.max_buffer = max_buffer
+        self.buffer = []
+        self.timer = None
+        self.tasks = set()
+        self.failures = 0
+        self.lock = asyncio.Lock()
+
+    def record(self, channel_id: int, message_id: int, content: dict | None, reply_markup, broadcast_id=None):
+        """Queue a ledger entry; `content=None` leaves the stored content hash unchanged (button-only edits)."""
+        now = datetime.now(timezone.utc)
+        entry = {
+            "channel_id": channel_id,
+            "message_id": message_id,
+            "buttons_hash": buttons_hash(reply_markup),
+            "updated_at": now,
+            "created_at": now
+        }
+        if content:
+            entry["content_hash"] = content_hash(content)
+        if broadcast_id is not None:
+            entry["broadcast_id"] = broadcast_id
+        self.buffer.append(entry)
+        self._trim()
+        if len(self.buffer) >= self.batch_size and not self.failures and not self.tasks:
+            self._start_flush()
+        else:
+            self._schedule_flush()
+
+    def _trim(self):
+        overflow = len(self.buffer) - self.max_buffer
+        if overflow > 0:
+            del self.buffer[:overflow]
+            logger.warning(f"Ledger buffer full, dropped the {overflow} oldest record(s)")
+
+    def _schedule_flush(self):
+        if self.timer is None:
+            delay = min(self.flush_delay * 2 ** self.failures, MAX_RETRY_DELAY)
+            self.timer = asyncio.get_running_loop().call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        task = asyncio.create_task(self.flush())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def flush(self) -> int:
+        """Write buffered records; on failure they are queued again and retried after a growing delay."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        async with self.lock:
+            records, self.buffer = self.buffer, []
+            if not records:
+                return 0
+            written = await mongo_db.record_posts(records)
+            if written is None:
+                self.buffer = records + self.buffer
+                self._trim()
+                self.failures += 1
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                self._schedule_flush()
+                logger.warning(f"Recording {len(records)} post(s) in the ledger failed, will retry (attempt {self.failures})")
+                return 0
+            self.failures = 0
+            logger.info(f"Recorded {len(records)} post(s) in the ledger")
+            return written
+
+post_ledger = PostLedger()
@@ -2,9 +2,12 @@
 # Channel  : https://t.me/NxMirror
 # Contact  : @FTKrshna
 
+from datetime import datetime, timedelta, timezone
 from bot.logger import setup_logger
 from motor.motor_asyncio import AsyncIOMotorClient
-from config import DB_URL
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from config import DB_URL, QUARANTINE_THRESHOLD, QUARANTINE_BASE_DELAY, FSM_SESSION_TTL, IDEMPOTENCY_TTL
 
 logger = setup_logger(__name__)
 
@@ -14,25 +17,202 @@ class MongoDB:
         self.db = self.client["krshna"]
         self.channels = self.db.channels
         self.default_buttons = self.db.default_buttons
+        self.broadcast_jobs = self.db.broadcast_jobs
+        self.broadcast_deliveries = self.db.broadcast_deliveries
+        self.posts = self.db.posts
+        self.popups = self.db.popups
+        self.fsm_sessions = self.db.fsm_sessions
+        self.idempotency_keys = self.db.idempotency_keys
 
-    async def add_channel(self, channel_id: int, title: str) -> bool:
+    async def _merge_duplicates(self, collection, field: str) -> int:
+        """Merge documents sharing a `field` value so a unique index on it can be built over legacy data.
+
+        The oldest document (lowest `_id`) is kept; it takes fields it lacks from the newer ones and the union of
+        list fields such as tags. Every merge is logged before the newer documents are deleted.
+        """
+        removed = 0
+        async for group in collection.aggregate([
+            {"$group": {"_id": f"${field}", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}}
+        ]):
+            docs = await collection.find({"_id": {"$in": group["ids"]}}).sort("_id", 1).to_list(None)
+            keeper, duplicates = docs[0], docs[1:]
+            merged = {}
+            for doc in duplicates:
+                for key, value in doc.items():
+                    if key == "_id":
+                        continue
+                    if key not in keeper and key not in merged:
+                        merged[key] = value
+                        continue
+                    current = merged.get(key, keeper.get(key))
+                    if isinstance(current, list) and isinstance(value, list):
+                        union = current + [item for item in value if item not in current]
+                        if union != current:
+                            merged[key] = union
+            duplicate_ids = [doc["_id"] for doc in duplicates]
+            logger.warning(
+                f"Merging {len(duplicate_ids)} duplicate(s) of {field}={group['_id']} in {collection.name} "
+                f"into {keeper['_id']}: removing {duplicate_ids}, merged fields {sorted(merged)}"
+            )
+            if merged:
+                await collection.update_one({"_id": keeper["_id"]}, {"$set": merged})
+            result = await collection.delete_many({"_id": {"$in": duplicate_ids}})
+            removed += result.deleted_count
+        if removed:
+            logger.warning(f"Merged away {removed} duplicate document(s) by {field} in {collection.name}")
+        return removed
+
+    async def ensure_indexes(self):
+        """Create every index the bot relies on; run once at startup."""
+        indexes = [
+            (self.channels, "channel_id", {"unique": True}),
+            (self.channels, "tags", {}),
+            (self.channels, "next_probe_at", {"sparse": True}),
+            (self.default_buttons, "user_id", {"unique": True}),
+            (self.broadcast_jobs, [("status", 1), ("created_at", -1)], {}),
+            (self.broadcast_deliveries, [("job_id", 1), ("channel_id", 1)], {"unique": True}),
+            (self.broadcast_deliveries, [("job_id", 1), ("status", 1)], {}),
+            (self.posts, [("channel_id", 1), ("message_id", 1)], {"unique": True}),
+            (self.posts, "broadcast_id", {"sparse": True}),
+            (self.fsm_sessions, "updated_at", {"expireAfterSeconds": FSM_SESSION_TTL}),
+            (self.idempotency_keys, "created_at", {"expireAfterSeconds": IDEMPOTENCY_TTL}),
+        ]
+        for collection, keys, options in indexes:
+            try:
+                if options.get("unique") and isinstance(keys, str):
+                    await self._merge_duplicates(collection, keys)
+                await collection.create_index(keys, **options)
+            except Exception as e:
+                logger.error(f"Error creating index {keys} on {collection.name}: {str(e)}")
+        logger.info("Database indexes ensured")
+
+    async def add_channel(self, channel_id: int, title: str):
+        """Insert the channel in one round-trip; returns the new document's _id, or None when it already exists."""
         try:
-            if not await self.channels.find_one({"channel_id": channel_id}):
-                await self.channels.insert_one({"channel_id": channel_id, "title": title})
+            result = await self.channels.update_one(
+                {"channel_id": channel_id},
+                {"$setOnInsert": {"channel_id": channel_id, "title": title}},
+                upsert=True
+            )
+            if result.upserted_id is not None:
                 logger.info(f"Added channel {channel_id} ({title}) to database")
-                return True
-            return False
+            return result.upserted_id
+        except DuplicateKeyError:
+            return None
         except Exception as e:
             logger.error(f"Error adding channel: {str(e)}")
+            return None
+
+    async def add_channels(self, channels: list) -> list:
+        """Upsert many (channel_id, title) pairs in one bulk write and return (channel_id, _id) for the newly inserted ones."""
+        if not channels:
+            return []
+        try:
+            result = await self.channels.bulk_write([
+                UpdateOne(
+                    {"channel_id": channel_id},
+                    {"$setOnInsert": {"channel_id": channel_id, "title": title}},
+                    upsert=True
+                )
+                for channel_id, title in channels
+            ], ordered=False)
+            added = [(channels[index][0], doc_id) for index, doc_id in result.upserted_ids.items()]
+            logger.info(f"Bulk added {len(added)} of {len(channels)} channel(s) to database")
+            return added
+        except BulkWriteError as e:
+            # Unordered writes keep going past errors: report the channels that were inserted anyway
+            added = [(channels[op["index"]][0], op["_id"]) for op in e.details.get("upserted", [])]
+            logger.error(f"Bulk adding channels partially failed, {len(added)} added: {e.details.get('writeErrors')}")
+            return added
+        except Exception as e:
+            logger.error(f"Error bulk adding channels: {str(e)}")
+            return []
+
+    async def apply_channel_health(self, updates: list) -> int:
+        """Store health-check results in one bulk write: refresh titles and set or clear the unreachable flag."""
+        if not updates:
+            return 0
+        try:
+            operations = []
+            for update in updates:
+                fields = {"unreachable": bool(update["error"]), "last_error": update["error"], "checked_at": update["checked_at"]}
+                if update["title"]:
+                    fields["title"] = update["title"]
+                operations.append(UpdateOne({"channel_id": update["channel_id"]}, {"$set": fields}))
+            result = await self.channels.bulk_write(operations, ordered=False)
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error storing channel health results: {str(e)}")
+            return 0
+
+    async def record_delivery_outcomes(self, succeeded: list, permanently_failed: list) -> list:
+        """Reset failure counters of delivered channels, count permanent failures, and return the ids newly quarantined."""
+        try:
+            if succeeded:
+                await self.channels.update_many({"channel_id": {"$in": succeeded}}, {"$set": {"failure_count": 0}})
+            if not permanently_failed:
+                return []
+            await self.channels.update_many({"channel_id": {"$in": permanently_failed}}, {"$inc": {"failure_count": 1}})
+            newly = [doc["channel_id"] async for doc in self.channels.find(
+                {"channel_id": {"$in": permanently_failed}, "failure_count": {"$gte": QUARANTINE_THRESHOLD}, "quarantined": {"$ne": True}},
+                {"channel_id": 1}
+            )]
+            if newly:
+                await self.channels.update_many(
+                    {"channel_id": {"$in": newly}},
+                    {"$set": {
+                        "quarantined": True,
+                        "probe_attempts": 0,
+                        "next_probe_at": datetime.now(timezone.utc) + timedelta(seconds=QUARANTINE_BASE_DELAY)
+                    }}
+                )
+                logger.warning(f"Quarantined {len(newly)} channel(s) after {QUARANTINE_THRESHOLD} consecutive failures: {newly}")
+            return newly
+        except Exception as e:
+            logger.error(f"Error recording delivery outcomes: {str(e)}")
+            return []
+
+    async def get_channels_due_for_probe(self) -> list:
+        try:
+            cursor = self.channels.find({"quarantined": True, "next_probe_at": {"$lte": datetime.now(timezone.utc)}})
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error fetching quarantined channels due for probe: {str(e)}")
+            return []
+
+    async def release_channel(self, channel_id: int) -> bool:
+        try:
+            result = await self.channels.update_one(
+                {"channel_id": channel_id},
+                {"$set": {"quarantined": False, "failure_count": 0}, "$unset": {"next_probe_at": "", "probe_attempts": ""}}
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            logger.error(f"Error releasing channel {channel_id}: {str(e)}")
+            return False
+
+    async def postpone_probe(self, channel_id: int, probe_attempts: int) -> bool:
+        """Schedule the next re-probe with exponential backoff: base delay * 2^attempts, capped at one week."""
+        try:
+            delay = min(QUARANTINE_BASE_DELAY * 2 ** probe_attempts, 7 * 24 * 3600)
+            await self.channels.update_one(
+                {"channel_id": channel_id},
+                {"$set": {"probe_attempts": probe_attempts, "next_probe_at": datetime.now(timezone.utc) + timedelta(seconds=delay)}}
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error postponing probe of channel {channel_id}: {str(e)}")
             return False
 
-    async def get_channels(self) -> list:
+    async def get_channels(self) -> list | None:
+        """Every channel document; None on a database error, so callers can tell it from an empty collection."""
         try:
             cursor = self.channels.find()
             return await cursor.to_list(length=None)
         except Exception as e:
             logger.error(f"Error fetching channels: {str(e)}")
-            return []
+            return None
 
     async def remove_channel(self, channel_id: int) -> bool:
         try:
@@ -42,6 +222,41 @@ class MongoDB:
             logger.error(f"Error removing channel: {str(e)}")
             return False
 
+    async def add_channel_tags(self, channel_id: int, tags: list) -> bool:
+        try:
+            result = await self.channels.update_one({"channel_id": channel_id}, {"$addToSet": {"tags": {"$each": tags}}})
+            return result.matched_count > 0
+        except Exception as e:
+            logger.error(f"Error tagging channel {channel_id}: {str(e)}")
+            return False
+
+    async def remove_channel_tags(self, channel_id: int, tags: list) -> bool:
+        try:
+            result = await self.channels.update_one({"channel_id": channel_id}, {"$pull": {"tags": {"$in": tags}}})
+            return result.matched_count > 0
+        except Exception as e:
+            logger.error(f"Error untagging channel {channel_id}: {str(e)}")
+            return False
+
+    async def get_channels_by_tags(self, tags: list) -> list:
+        """Channels carrying any of `tags`, resolved with one query on the multikey tags index."""
+        try:
+            cursor = self.channels.find(
+                {"tags": {"$in": tags}, "unreachable": {"$ne": True}, "quarantined": {"$ne": True}},
+                {"channel_id": 1, "title": 1}
+            )
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error fetching channels for tags {tags}: {str(e)}")
+            return []
+
+    async def get_all_tags(self) -> list:
+        try:
+            return sorted(await self.channels.distinct("tags"))
+        except Exception as e:
+            logger.error(f"Error fetching channel tags: {str(e)}")
+            return []
+
     async def clear_all_channels(self) -> int:
         """Delete all channels from the database and return the number of deleted channels."""
         try:
@@ -83,4 +298,223 @@ class MongoDB:
             logger.error(f"Error deleting default buttons for user {user_id}: {str(e)}")
             return False
 
+    async def create_broadcast_job(self, user_id: int, chat_id: int, content: dict, reply_markup: dict | None, channel_ids: list):
+        """Store a broadcast with one pending delivery document per channel and return the job id."""
+        try:
+            now = datetime.now(timezone.utc)
+            result = await self.broadcast_jobs.insert_one({
+                "user_id": user_id,
+                "chat_id": chat_id,
+                "content": content,
+                "reply_markup": reply_markup,
+                "total": len(channel_ids),
+                "status": "running",
+                "created_at": now
+            })
+            if channel_ids:
+                await self.broadcast_deliveries.insert_many([
+                    {"job_id": result.inserted_id, "channel_id": channel_id, "status": "pending", "updated_at": now}
+                    for channel_id in channel_ids
+                ], ordered=False)
+            logger.info(f"Created broadcast job {result.inserted_id} for {len(channel_ids)} channels")
+            return result.inserted_id
+        except Exception as e:
+            logger.error(f"Error creating broadcast job: {str(e)}")
+            return None
+
+    async def get_unfinished_broadcast_jobs(self) -> list:
+        try:
+            cursor = self.broadcast_jobs.find({"status": "running"})
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error fetching unfinished broadcast jobs: {str(e)}")
+            return []
+
+    async def get_pending_deliveries(self, job_id) -> list:
+        try:
+            cursor = self.broadcast_deliveries.find({"job_id": job_id, "status": "pending"}, {"channel_id": 1})
+            return [doc["channel_id"] for doc in await cursor.to_list(length=None)]
+        except Exception as e:
+            logger.error(f"Error fetching pending deliveries for job {job_id}: {str(e)}")
+            return []
+
+    async def fail_interrupted_deliveries(self, job_id) -> int:
+        """Mark deliveries claimed by a previous run as failed: they may or may not have been sent, so they are never retried."""
+        try:
+            result = await self.broadcast_deliveries.update_many(
+                {"job_id": job_id, "status": "sending"},
+                {"$set": {"status": "failed", "error": "Interrupted before delivery was confirmed", "updated_at": datetime.now(timezone.utc)}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error failing interrupted deliveries for job {job_id}: {str(e)}")
+            return 0
+
+    async def claim_delivery(self, job_id, channel_id: int) -> bool | None:
+        """Atomically move a delivery from pending to sending; only the caller that wins the claim may send.
+
+        Returns True when claimed, False when another runner already claimed it, None on a database error
+        (the delivery stays pending).
+        """
+        try:
+            result = await self.broadcast_deliveries.update_one(
+                {"job_id": job_id, "channel_id": channel_id, "status": "pending"},
+                {"$set": {"status": "sending", "updated_at": datetime.now(timezone.utc)}}
+            )
+            return result.modified_count == 1
+        except Exception as e:
+            logger.error(f"Error claiming delivery of job {job_id} to channel {channel_id}: {str(e)}")
+            return None
+
+    async def complete_delivery(self, job_id, channel_id: int, message_id: int = None, error: str = None) -> bool:
+        try:
+            update = {"status": "failed" if error else "sent", "updated_at": datetime.now(timezone.utc)}
+            if error:
+                update["error"] = error
+            else:
+                update["message_id"] = message_id
+            await self.broadcast_deliveries.update_one({"job_id": job_id, "channel_id": channel_id}, {"$set": update})
+            return True
+        except Exception as e:
+            logger.error(f"Error completing delivery of job {job_id} to channel {channel_id}: {str(e)}")
+            return False
+
+    async def get_deliveries(self, job_id) -> list:
+        try:
+            cursor = self.broadcast_deliveries.find({"job_id": job_id})
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error fetching deliveries for job {job_id}: {str(e)}")
+            return []
+
+    async def delete_broadcast_posts(self, broadcast_id, channel_ids: list) -> int:
+        try:
+            result = await self.posts.delete_many({"broadcast_id": broadcast_id, "channel_id": {"$in": channel_ids}})
+            return result.deleted_count
+        except Exception as e:
+            logger.error(f"Error deleting posts of broadcast {broadcast_id}: {str(e)}")
+            return 0
+
+    async def get_broadcast_job(self, job_id) -> dict | None:
+        try:
+            return await self.broadcast_jobs.find_one({"_id": job_id})
+        except Exception as e:
+            logger.error(f"Error fetching broadcast job {job_id}: {str(e)}")
+            return None
+
+    async def get_recent_broadcast_jobs(self, limit: int = 10) -> list:
+        try:
+            cursor = self.broadcast_jobs.find({"status": "done"}).sort("created_at", -1).limit(limit)
+            return await cursor.to_list(length=limit)
+        except Exception as e:
+            logger.error(f"Error fetching recent broadcast jobs: {str(e)}")
+            return []
+
+    async def update_broadcast_job(self, job_id, fields: dict) -> bool:
+        try:
+            await self.broadcast_jobs.update_one({"_id": job_id}, {"$set": fields})
+            return True
+        except Exception as e:
+            logger.error(f"Error updating broadcast job {job_id}: {str(e)}")
+            return False
+
+    async def finish_broadcast_job(self, job_id) -> bool:
+        try:
+            await self.broadcast_jobs.update_one(
+                {"_id": job_id},
+                {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc)}}
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error finishing broadcast job {job_id}: {str(e)}")
+            return False
+
+    async def record_posts(self, records: list) -> int | None:
+        """Upsert a batch of ledger entries keyed by (channel_id, message_id) in a single bulk write. None on a write error."""
+        if not records:
+            return 0
+        try:
+            operations = []
+            for record in records:
+                fields = {k: v for k, v in record.items() if k != "created_at"}
+                operations.append(UpdateOne(
+                    {"channel_id": record["channel_id"], "message_id": record["message_id"]},
+                    {"$set": fields, "$setOnInsert": {"created_at": record["created_at"]}},
+                    upsert=True
+                ))
+            result = await self.posts.bulk_write(operations, ordered=False)
+            return result.upserted_count + result.modified_count
+        except Exception as e:
+            logger.error(f"Error recording {len(records)} posts: {str(e)}")
+            return None
+
+    async def save_popups(self, popups: dict) -> bool:
+        """Insert popup texts keyed by their content-hash id; existing ids are left untouched. False on a write error."""
+        if not popups:
+            return True
+        try:
+            now = datetime.now(timezone.utc)
+            await self.popups.bulk_write([
+                UpdateOne({"_id": key}, {"$setOnInsert": {"text": text, "created_at": now}}, upsert=True)
+                for key, text in popups.items()
+            ], ordered=False)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving {len(popups)} popups: {str(e)}")
+            return False
+
+    async def get_popup(self, key: str) -> str | None:
+        try:
+            doc = await self.popups.find_one({"_id": key})
+            return doc["text"] if doc else None
+        except Exception as e:
+            logger.error(f"Error fetching popup {key}: {str(e)}")
+            return None
+
+    async def claim_idempotency_key(self, key: str) -> bool:
+        """Insert the key; False when it was already claimed. Fails open so a database error never blocks publishing."""
+        try:
+            await self.idempotency_keys.insert_one({"_id": key, "created_at": datetime.now(timezone.utc)})
+            return True
+        except DuplicateKeyError:
+            return False
+        except Exception as e:
+            logger.error(f"Error claiming idempotency key {key}: {str(e)}")
+            return True
+
+    async def get_fsm_session(self, key: str) -> dict | None:
+        try:
+            return await self.fsm_sessions.find_one({"_id": key})
+        except Exception as e:
+            logger.error(f"Error fetching FSM session {key}: {str(e)}")
+            return None
+
+    async def save_fsm_session(self, key: str, state: str | None, data: str, bucket: dict) -> bool:
+        try:
+            await self.fsm_sessions.update_one(
+                {"_id": key},
+                {"$set": {"state": state, "data": data, "bucket": bucket, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error saving FSM session {key}: {str(e)}")
+            return False
+
+    async def delete_fsm_session(self, key: str) -> bool:
+        try:
+            await self.fsm_sessions.delete_one({"_id": key})
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting FSM session {key}: {str(e)}")
+            return False
+
+    async def get_broadcast_posts(self, broadcast_id) -> list:
+        try:
+            cursor = self.posts.find({"broadcast_id": broadcast_id})
+            return await cursor.to_list(length=None)
+        except Exception as e:
+            logger.error(f"Error fetching posts of broadcast {broadcast_id}: {str(e)}")
+            return []
+
 mongo_db = MongoDB()
@@ -0,0 +1,94 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import asyncio
+import base64
+import hashlib
+from collections import OrderedDict
+from bot.logger import setup_logger
+from .mongo import mongo_db
+
+logger = setup_logger(__name__)
+
+CACHE_SIZE = 1024
+FLUSH_DELAY = 1.0
+# Telegram's limit for callback query answers (popups and alerts)
+MAX_POPUP_LENGTH = 200
+
+def popup_id(text: str) -> str:
+    """Short content-hash id for a popup text: 12 url-safe characters (72 bits)."""
+    return base64.urlsafe_b64encode(hashlib.sha256(text.encode()).digest()[:9]).decode()
+
+class PopupStore:
+    """Popup/alert texts stored server-side by content hash, so buttons only carry a short id in callback_data.
+
+    Texts are served from an in-process LRU; new texts are written to the popups collection in batches.
+    """
+
+    def __init__(self, cache_size: int = CACHE_SIZE, flush_delay: float = FLUSH_DELAY):
+        self.cache_size = cache_size
+        self.flush_delay = flush_delay
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.timer = None
+        self.tasks = set()
+        self.lock = asyncio.Lock()
+
+    def _remember(self, key: str, text: str):
+        self.cache[key] = text
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def put(self, text: str) -> str:
+        """Register a popup text and return its id; the database write is batched."""
+        key = popup_id(text)
+        if key not in self.cache:
+            self.pending[key] = text
+            self._schedule_flush()
+        self._remember(key, text)
+        return key
+
+    def _schedule_flush(self):
+        if self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.flush_delay, self._start_flush)
+
+    def _start_flush(self):
+        self.timer = None
+        task = asyncio.create_task(self.flush())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def get(self, key: str) -> str | None:
+        text = self.cache.get(key)
+        if text is not None:
+            self.cache.move_to_end(key)
+            return text
+        text = self.pending.get(key) or await mongo_db.get_popup(key)
+        if text is not None:
+            self._remember(key, text)
+        return text
+
+    async def flush(self) -> bool:
+        """Write pending texts; on failure they are queued again and retried, so a published button never loses its text.
+
+        Writes are serialized: a flush waits for one already in flight, so True means every text registered before
+        the call is stored.
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        async with self.lock:
+            popups, self.pending = self.pending, {}
+            if not popups:
+                return True
+            if not await mongo_db.save_popups(popups):
+                self.pending = {**popups, **self.pending}
+                self._schedule_flush()
+                logger.warning(f"Storing {len(popups)} popup text(s) failed, will retry")
+                return False
+            logger.info(f"Stored {len(popups)} popup text(s)")
+            return True
+
+popup_store = PopupStore()
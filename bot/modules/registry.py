@@ -0,0 +1,249 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import asyncio
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from bot.logger import setup_logger
+from config import DEFAULT_CHANNELS, CHANNELS_PAGE_SIZE
+from ..helpers import channel_cache
+from .mongo import mongo_db
+from .search import ChannelSearchIndex
+
+logger = setup_logger(__name__)
+
+class ChannelRegistry:
+    """In-memory, channel_id-indexed view of the channels collection, loaded once and updated on every write."""
+
+    def __init__(self):
+        self.channels = {}
+        self.sorted_ids = []
+        self.unreachable = set()
+        self.quarantined = set()
+        self.doc_ids = {}
+        self.channel_docs = {}
+        self.search_index = ChannelSearchIndex()
+        self.version = 0
+        self.loaded = False
+        self.watcher = None
+
+    async def load(self) -> bool:
+        """Replace the registry with the channels collection.
+
+        On a database error the registry stays unloaded, so the next read loads it again.
+        """
+        docs = await mongo_db.get_channels()
+        if docs is None:
+            self.loaded = False
+            logger.warning("Loading the channel registry failed, will retry on the next request")
+            return False
+        self.channels = {ch["channel_id"]: {"channel_id": ch["channel_id"], "title": ch["title"]} for ch in docs}
+        self.sorted_ids = sorted(self.channels)
+        self.unreachable = {ch["channel_id"] for ch in docs if ch.get("unreachable")}
+        self.quarantined = {ch["channel_id"] for ch in docs if ch.get("quarantined")}
+        self.doc_ids = {ch["_id"]: ch["channel_id"] for ch in docs}
+        self.channel_docs = {ch["channel_id"]: ch["_id"] for ch in docs}
+        self.search_index.clear()
+        for channel in self.channels.values():
+            self.search_index.add(channel["channel_id"], channel["title"])
+        self.version += 1
+        self.loaded = True
+        logger.info(f"Channel registry loaded {len(self.channels)} channel(s)")
+        return True
+
+    def _put(self, channel_id: int, title: str):
+        if channel_id not in self.channels:
+            insort(self.sorted_ids, channel_id)
+        self.channels[channel_id] = {"channel_id": channel_id, "title": title}
+        self.search_index.add(channel_id, title)
+        self.version += 1
+
+    def _map_doc(self, doc_id, channel_id: int):
+        self.doc_ids[doc_id] = channel_id
+        self.channel_docs[channel_id] = doc_id
+
+    def _drop(self, channel_id: int):
+        self.doc_ids.pop(self.channel_docs.pop(channel_id, None), None)
+        self.unreachable.discard(channel_id)
+        self.quarantined.discard(channel_id)
+        if self.channels.pop(channel_id, None) is not None:
+            del self.sorted_ids[bisect_left(self.sorted_ids, channel_id)]
+            self.search_index.remove(channel_id)
+            self.version += 1
+
+    async def _default_extras(self, bot) -> list:
+        """DEFAULT_CHANNELS that are not saved in the database, sorted by channel_id."""
+        if not DEFAULT_CHANNELS:
+            return []
+        default_channels = await channel_cache.get_many(bot, DEFAULT_CHANNELS)
+        return sorted((ch for ch in default_channels if ch["channel_id"] not in self.channels), key=lambda ch: ch["channel_id"])
+
+    async def get_channels(self, bot, include_defaults: bool = True, skip_unreachable: bool = False) -> list:
+        """Return saved channels, followed by the DEFAULT_CHANNELS not saved in the database.
+
+        `skip_unreachable` also leaves out quarantined channels, so broadcasts do not keep hitting them.
+        """
+        if not self.loaded:
+            await self.load()
+        channels = list(self.channels.values())
+        if skip_unreachable and (self.unreachable or self.quarantined):
+            channels = [
+                ch for ch in channels
+                if ch["channel_id"] not in self.unreachable and ch["channel_id"] not in self.quarantined
+            ]
+        if include_defaults:
+            channels += await self._default_extras(bot)
+        return channels
+
+    async def get_page(self, bot, after: int = None, before: int = None, limit: int = CHANNELS_PAGE_SIZE, include_defaults: bool = True):
+        """Keyset page ordered by channel_id: the `limit` channels after `after`, or the `limit` channels before `before`.
+
+        Returns (channels, has_prev, has_next). Cost depends on `limit`, not on the number of channels.
+        """
+        if not self.loaded:
+            await self.load()
+        extras = await self._default_extras(bot) if include_defaults else []
+        extra_ids = [ch["channel_id"] for ch in extras]
+        ids = self.sorted_ids
+        if before is None:
+            start, extra_start = (bisect_right(ids, after), bisect_right(extra_ids, after)) if after is not None else (0, 0)
+            page_ids = list(heapq.merge(ids[start:start + limit], extra_ids[extra_start:extra_start + limit]))[:limit]
+        else:
+            end, extra_end = bisect_left(ids, before), bisect_left(extra_ids, before)
+            page_ids = list(heapq.merge(ids[max(0, end - limit):end], extra_ids[max(0, extra_end - limit):extra_end]))[-limit:]
+        if not page_ids:
+            return [], False, False
+        first = min(ids[0] if ids else page_ids[0], extra_ids[0] if extra_ids else page_ids[0])
+        last = max(ids[-1] if ids else page_ids[-1], extra_ids[-1] if extra_ids else page_ids[-1])
+        by_id = {ch["channel_id"]: ch for ch in extras}
+        channels = [self.channels.get(channel_id) or by_id[channel_id] for channel_id in page_ids]
+        return channels, page_ids[0] != first, page_ids[-1] != last
+
+    async def search(self, bot, query: str, limit: int = 50) -> list:
+        """Channels whose title starts with or contains `query`, including unsaved DEFAULT_CHANNELS."""
+        if not self.loaded:
+            await self.load()
+        channels = [self.channels[channel_id] for channel_id in self.search_index.search(query, limit)]
+        needle = query.strip().casefold()
+        for channel in await self._default_extras(bot):
+            if len(channels) >= limit:
+                break
+            if needle in channel["title"].casefold():
+                channels.append(channel)
+        return channels
+
+    def apply_health(self, updates: list):
+        """Apply health-check results: refresh changed titles and track unreachable channels."""
+        for update in updates:
+            channel_id = update["channel_id"]
+            if channel_id not in self.channels:
+                continue
+            if update["error"]:
+                self.unreachable.add(channel_id)
+            else:
+                self.unreachable.discard(channel_id)
+            if update["title"] and update["title"] != self.channels[channel_id]["title"]:
+                self._put(channel_id, update["title"])
+
+    async def record_delivery_outcomes(self, succeeded: list, permanently_failed: list) -> list:
+        """Persist per-channel delivery results and quarantine channels that crossed the failure threshold."""
+        newly = await mongo_db.record_delivery_outcomes(succeeded, permanently_failed)
+        if newly:
+            self.quarantined.update(channel_id for channel_id in newly if channel_id in self.channels)
+            self.version += 1
+        return newly
+
+    async def release(self, channel_id: int) -> bool:
+        released = await mongo_db.release_channel(channel_id)
+        if released and channel_id in self.quarantined:
+            self.quarantined.discard(channel_id)
+            self.version += 1
+        return released
+
+    def get_quarantined(self) -> list:
+        return [self.channels[channel_id] for channel_id in sorted(self.quarantined) if channel_id in self.channels]
+
+    def get(self, channel_id: int) -> dict | None:
+        return self.channels.get(channel_id)
+
+    async def is_known(self, channel_id: int) -> bool:
+        """True for saved channels and DEFAULT_CHANNELS."""
+        if not self.loaded:
+            await self.load()
+        return channel_id in self.channels or channel_id in DEFAULT_CHANNELS
+
+    async def add(self, channel_id: int, title: str) -> bool:
+        doc_id = await mongo_db.add_channel(channel_id, title)
+        if doc_id is None:
+            return False
+        self._map_doc(doc_id, channel_id)
+        self._put(channel_id, title)
+        return True
+
+    async def add_many(self, channels: list) -> list:
+        added = await mongo_db.add_channels(channels)
+        titles = dict(channels)
+        for channel_id, doc_id in added:
+            self._map_doc(doc_id, channel_id)
+            self._put(channel_id, titles[channel_id])
+        return [channel_id for channel_id, _ in added]
+
+    async def remove(self, channel_id: int) -> bool:
+        removed = await mongo_db.remove_channel(channel_id)
+        if removed:
+            self._drop(channel_id)
+            channel_cache.invalidate(channel_id)
+        return removed
+
+    async def clear(self) -> int:
+        deleted_count = await mongo_db.clear_all_channels()
+        self.channels.clear()
+        self.sorted_ids.clear()
+        self.unreachable.clear()
+        self.quarantined.clear()
+        self.doc_ids.clear()
+        self.channel_docs.clear()
+        self.search_index.clear()
+        self.version += 1
+        channel_cache.invalidate()
+        return deleted_count
+
+    async def _watch(self):
+        """Apply channel writes made by other bot instances; a delete we cannot map to a channel triggers a full reload."""
+        while True:
+            try:
+                async with mongo_db.channels.watch(full_document="updateLookup") as stream:
+                    if not await self.load():
+                        raise RuntimeError("could not load the channels collection")
+                    async for change in stream:
+                        operation = change["operationType"]
+                        if operation in ("insert", "update", "replace") and change.get("fullDocument"):
+                            doc = change["fullDocument"]
+                            self._map_doc(doc["_id"], doc["channel_id"])
+                            self._put(doc["channel_id"], doc["title"])
+                            if doc.get("quarantined"):
+                                self.quarantined.add(doc["channel_id"])
+                            else:
+                                self.quarantined.discard(doc["channel_id"])
+                        elif operation == "delete" and change["documentKey"]["_id"] in self.doc_ids:
+                            self._drop(self.doc_ids[change["documentKey"]["_id"]])
+                        elif not await self.load():
+                            raise RuntimeError("could not reload the channels collection")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Channel change stream failed, retrying in 10s: {str(e)}")
+                await asyncio.sleep(10)
+
+    def start_watching(self):
+        if self.watcher is None:
+            self.watcher = asyncio.create_task(self._watch())
+            logger.info("Watching the channels collection for changes")
+
+    def stop_watching(self):
+        if self.watcher is not None:
+            self.watcher.cancel()
+            self.watcher = None
+
+channel_registry = ChannelRegistry()
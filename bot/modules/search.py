@@ -0,0 +1,75 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+from bisect import bisect_left, insort
+from bot.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class ChannelSearchIndex:
+    """Title search over channels: a sorted title array for prefix lookups and a trigram index for substrings."""
+
+    def __init__(self):
+        self.titles = {}
+        self.sorted_titles = []
+        self.trigrams = {}
+
+    def add(self, channel_id: int, title: str):
+        if channel_id in self.titles:
+            self.remove(channel_id)
+        key = title.casefold()
+        self.titles[channel_id] = key
+        insort(self.sorted_titles, (key, channel_id))
+        for trigram in _trigrams(key):
+            self.trigrams.setdefault(trigram, set()).add(channel_id)
+
+    def remove(self, channel_id: int):
+        key = self.titles.pop(channel_id, None)
+        if key is None:
+            return
+        del self.sorted_titles[bisect_left(self.sorted_titles, (key, channel_id))]
+        for trigram in _trigrams(key):
+            ids = self.trigrams.get(trigram)
+            if ids is not None:
+                ids.discard(channel_id)
+                if not ids:
+                    del self.trigrams[trigram]
+
+    def clear(self):
+        self.titles.clear()
+        self.sorted_titles.clear()
+        self.trigrams.clear()
+
+    def search(self, query: str, limit: int = 50) -> list:
+        """Return up to `limit` channel ids: title-prefix matches first, then substring matches."""
+        query = query.strip().casefold()
+        if not query:
+            return [channel_id for _, channel_id in self.sorted_titles[:limit]]
+        results = []
+        start = bisect_left(self.sorted_titles, (query,))
+        for index in range(start, len(self.sorted_titles)):
+            key, channel_id = self.sorted_titles[index]
+            if not key.startswith(query) or len(results) >= limit:
+                break
+            results.append(channel_id)
+        if len(results) >= limit or len(query) < 3:
+            return results
+        candidates = None
+        for trigram in sorted(_trigrams(query), key=lambda t: len(self.trigrams.get(t, ()))):
+            ids = self.trigrams.get(trigram)
+            if not ids:
+                return results
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                return results
+        seen = set(results)
+        for channel_id in sorted(candidates, key=self.titles.get):
+            if channel_id not in seen and query in self.titles[channel_id]:
+                results.append(channel_id)
+                if len(results) >= limit:
+                    break
+        return results
@@ -0,0 +1,95 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import copy
+import json
+from dataclasses import dataclass, field, fields
+from aiogram import types
+
+BUTTON_FIELDS = ("url", "callback_data", "switch_inline_query")
+
+def markup_to_rows(reply_markup: types.InlineKeyboardMarkup | None) -> tuple | None:
+    """Compact form of a keyboard: rows of (text, field, value) triples."""
+    if reply_markup is None:
+        return None
+    rows = []
+    for row in reply_markup.inline_keyboard:
+        compact = []
+        for button in row:
+            name = next((name for name in BUTTON_FIELDS if getattr(button, name) is not None), None)
+            compact.append((button.text, name, getattr(button, name)) if name else (button.text, None, None))
+        rows.append(tuple(compact))
+    return tuple(rows)
+
+def rows_to_markup(rows: tuple | None) -> types.InlineKeyboardMarkup | None:
+    if rows is None:
+        return None
+    return types.InlineKeyboardMarkup(inline_keyboard=[
+        [types.InlineKeyboardButton(text, **({name: value} if name else {})) for text, name, value in row]
+        for row in rows
+    ])
+
+@dataclass(slots=True)
+class Session:
+    """Compact FSM session data: plain ids and flags, the content spec and keyboard rows as tuples.
+
+    Handlers keep using a dict (`to_data`/`update`); the keyboard is rebuilt only when the data is read.
+    """
+    user_id: int | None = None
+    flow: str | None = None
+    channel_id: int | None = None
+    edit_message_id: int | None = None
+    preview_message_id: int | None = None
+    broadcast_id: str | None = None
+    content: dict | None = None
+    buttons: tuple | None = None
+    keep_content: bool | None = None
+    keep_buttons: bool | None = None
+    target_tags: list | None = None
+    extra: dict = field(default_factory=dict)
+
+    def update(self, data: dict):
+        for key, value in data.items():
+            if key == "reply_markup":
+                self.buttons = markup_to_rows(value)
+            elif key in _SESSION_FIELDS:
+                setattr(self, key, copy.deepcopy(value))
+            else:
+                self.extra[key] = copy.deepcopy(value)
+
+    @classmethod
+    def from_data(cls, data: dict | None) -> "Session":
+        session = cls()
+        if data:
+            session.update(data)
+        return session
+
+    def to_data(self) -> dict:
+        data = copy.deepcopy(self.extra)
+        for name in _SESSION_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = copy.deepcopy(value)
+        if self.buttons is not None:
+            data["reply_markup"] = rows_to_markup(self.buttons)
+        return data
+
+    def is_empty(self) -> bool:
+        return self.buttons is None and not self.extra and all(getattr(self, name) is None for name in _SESSION_FIELDS)
+
+    def to_json(self) -> str:
+        payload = {name: value for name in _PERSISTED_FIELDS if (value := getattr(self, name)) is not None}
+        if not self.extra:
+            del payload["extra"]
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Session":
+        payload = json.loads(raw)
+        if payload.get("buttons") is not None:
+            payload["buttons"] = tuple(tuple(tuple(button) for button in row) for row in payload["buttons"])
+        return cls(**{name: payload[name] for name in _PERSISTED_FIELDS if name in payload})
+
+_PERSISTED_FIELDS = tuple(f.name for f in fields(Session))
+_SESSION_FIELDS = tuple(name for name in _PERSISTED_FIELDS if name not in ("buttons", "extra"))
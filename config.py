@@ -17,3 +17,45 @@ DB_NAME = os.environ.get("DB_NAME", "nitin")
 # Optional: List of default Telegram channels)
 # You can add unlimited channel directy from bot)
 DEFAULT_CHANNELS = list(map(int, os.environ.get("DEFAULT_CHANNELS", "-1002592795866").split(",")))
+
+# Maximum number of channels a broadcast sends to at the same time
+BROADCAST_CONCURRENCY = int(os.environ.get("BROADCAST_CONCURRENCY", "20"))
+# Minimum number of seconds between two edits of the live broadcast progress message
+BROADCAST_PROGRESS_INTERVAL = float(os.environ.get("BROADCAST_PROGRESS_INTERVAL", "5"))
+
+# Outbound flood control: messages per second for the whole bot, messages per minute for a single group or channel
+# and messages per second for a single private chat
+FLOOD_GLOBAL_RATE = float(os.environ.get("FLOOD_GLOBAL_RATE", "30"))
+FLOOD_CHAT_RATE = float(os.environ.get("FLOOD_CHAT_RATE", "20"))
+FLOOD_PRIVATE_RATE = float(os.environ.get("FLOOD_PRIVATE_RATE", "1"))
+# How many times a call rejected with retry_after is re-queued before it is reported as failed
+FLOOD_MAX_RETRIES = int(os.environ.get("FLOOD_MAX_RETRIES", "5"))
+
+# Copy mode: publish posts and broadcasts with copyMessage from the admin's original message (keeps formatting)
+COPY_MODE = os.environ.get("COPY_MODE", "True").lower() in ("true", "1", "yes")
+# Optional chat where source messages are staged once before being copied to channels (0 = copy from the admin chat)
+STAGING_CHAT_ID = int(os.environ.get("STAGING_CHAT_ID", "0"))
+
+# Seconds channel metadata fetched with get_chat stays cached
+CHANNEL_CACHE_TTL = int(os.environ.get("CHANNEL_CACHE_TTL", "600"))
+
+# Keep the in-memory channel registry in sync across several bot instances with a MongoDB change stream (needs a replica set)
+CHANNEL_CHANGE_STREAM = os.environ.get("CHANNEL_CHANGE_STREAM", "False").lower() in ("true", "1", "yes")
+
+# Number of channels shown per page in the channel pickers
+CHANNELS_PAGE_SIZE = int(os.environ.get("CHANNELS_PAGE_SIZE", "10"))
+
+# Background channel health check: seconds between runs and channels checked per second
+CHANNEL_HEALTH_INTERVAL = int(os.environ.get("CHANNEL_HEALTH_INTERVAL", "21600"))
+CHANNEL_HEALTH_RATE = float(os.environ.get("CHANNEL_HEALTH_RATE", "2"))
+
+# Quarantine channels after this many consecutive permanent delivery errors; first re-probe after QUARANTINE_BASE_DELAY seconds, doubling each time
+QUARANTINE_THRESHOLD = int(os.environ.get("QUARANTINE_THRESHOLD", "3"))
+QUARANTINE_BASE_DELAY = int(os.environ.get("QUARANTINE_BASE_DELAY", "3600"))
+
+# FSM sessions: idle seconds before a session expires, and sessions kept in the in-process cache
+FSM_SESSION_TTL = int(os.environ.get("FSM_SESSION_TTL", "86400"))
+FSM_CACHE_SIZE = int(os.environ.get("FSM_CACHE_SIZE", "1000"))
+
+# Seconds a confirmed post/broadcast idempotency key is remembered
+IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", "86400"))
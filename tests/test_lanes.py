@@ -0,0 +1,87 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+import asyncio
+from aiogram import Bot, Dispatcher, types
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.dispatcher import FSMContext
+from bot.helpers.lanes import UserLaneMiddleware
+from bot.krshnaa.handlers import PostState
+
+USERS = 200
+TAPS = 3
+
+class StubBot(Bot):
+    """Records outgoing messages instead of calling the Bot API; each send yields to the loop like a request would."""
+
+    def __init__(self):
+        super().__init__(token="123456:STUB")
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(0)
+        self.sent.append((chat_id, text))
+
+def confirm_tap(update_id: int, user_id: int) -> types.Update:
+    user = {"id": user_id, "is_bot": False, "first_name": "Admin"}
+    return types.Update.to_object({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": user,
+            "chat_instance": str(user_id),
+            "data": "confirm_post",
+            "message": {"message_id": 1, "date": 0, "chat": {"id": user_id, "type": "private"}, "from": user, "text": "Preview"}
+        }
+    })
+
+def build_dispatcher(raise_after_send=False, lanes=True):
+    bot = StubBot()
+    dp = Dispatcher(bot, storage=MemoryStorage())
+    middleware = UserLaneMiddleware()
+    if lanes:
+        dp.middleware.setup(middleware)
+
+    async def confirm(callback_query: types.CallbackQuery, state: FSMContext):
+        await bot.send_message(callback_query.from_user.id, "posted")
+        await state.finish()
+        if raise_after_send:
+            raise RuntimeError("handler failed after publishing")
+
+    dp.register_callback_query_handler(confirm, lambda c: c.data == "confirm_post", state=PostState.WaitingForPreview)
+    return bot, dp, middleware
+
+async def tap_confirm_concurrently(dp):
+    for user_id in range(1, USERS + 1):
+        await dp.storage.set_state(chat=user_id, user=user_id, state=PostState.WaitingForPreview.state)
+    updates = [confirm_tap(user_id * TAPS + tap, user_id) for user_id in range(1, USERS + 1) for tap in range(TAPS)]
+    # Same as Dispatcher.process_updates for a polling batch, but keeps handler errors instead of raising the first one
+    return await asyncio.gather(*(dp.updates_handler.notify(update) for update in updates), return_exceptions=True)
+
+async def run(raise_after_send=False, lanes=True):
+    bot, dp, middleware = build_dispatcher(raise_after_send, lanes)
+    Bot.set_current(bot)
+    Dispatcher.set_current(dp)
+    results = await tap_confirm_concurrently(dp)
+    return bot, middleware, results
+
+def test_each_user_publishes_once():
+    bot, middleware, results = asyncio.run(run())
+    assert not [r for r in results if isinstance(r, BaseException)]
+    assert len(bot.sent) == USERS
+    assert sorted(chat_id for chat_id, _ in bot.sent) == list(range(1, USERS + 1))
+    assert middleware.lanes.locks == {}
+
+def test_lanes_are_released_when_the_handler_raises():
+    bot, middleware, results = asyncio.run(run(raise_after_send=True))
+    errors = [r for r in results if isinstance(r, BaseException)]
+    assert len(errors) == USERS
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert len(bot.sent) == USERS
+    assert middleware.lanes.locks == {}
+
+def test_taps_race_without_lanes():
+    """Control: the same batch without the middleware publishes more than once per user."""
+    bot, _, _ = asyncio.run(run(lanes=False))
+    assert len(bot.sent) > USERS
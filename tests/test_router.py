@@ -0,0 +1,158 @@
+# © 2025 FtKrishna. All rights reserved.
+# Channel  : https://t.me/NxMirror
+# Contact  : @FTKrshna
+
+from datetime import datetime
+import pytest
+from bot.modules import popup_store
+from bot.krshnaa import handlers
+from bot.krshnaa import broadcaster
+from bot.krshnaa.keyboards import (
+    create_start_keyboard,
+    create_help_keyboard,
+    create_default_buttons_keyboard,
+    create_my_channels_keyboard,
+    create_quarantine_keyboard,
+    create_channel_selection_keyboard,
+    create_broadcast_selection_keyboard,
+    create_button_keyboard,
+    create_confirm_keyboard,
+    create_broadcast_target_keyboard
+)
+from bot.krshnaa.router import CallbackRouter, ANY_STATE
+from bot.krshnaa.handlers import PostState, EditState, DefaultButtonsState
+from bot.krshnaa.broadcaster import BroadcastState, BroadcastEditState, RetractState
+
+CHANNELS = [{"channel_id": -1001, "title": "One"}, {"channel_id": -1002, "title": "Two"}]
+JOBS = [{"_id": "65f000000000000000000001", "created_at": datetime(2025, 1, 1), "total": 2, "status": "done", "content": {"type": "text", "text": "hi"}}]
+BUTTONS = "Site - https://example.com && Info - popup: hello\nWarn - alert: careful && Share - share: hi"
+
+PREVIEW_STATES = {
+    PostState.WaitingForPreview: handlers.handle_preview_confirmation,
+    EditState.WaitingForPreview: handlers.handle_edit_confirmation,
+    BroadcastState.WaitingForPreview: broadcaster.handle_broadcast_confirmation,
+    BroadcastEditState.WaitingForPreview: broadcaster.handle_broadcast_edit_confirmation,
+    RetractState.WaitingForConfirmation: broadcaster.handle_retract_confirmation
+}
+BACK_STATES = [
+    PostState.WaitingForButtons,
+    EditState.WaitingForMessageId,
+    EditState.WaitingForContent,
+    EditState.WaitingForButtons,
+    BroadcastState.WaitingForButtons,
+    BroadcastEditState.WaitingForContent,
+    BroadcastEditState.WaitingForButtons,
+    DefaultButtonsState.WaitingForButtons
+]
+
+def callback_data(keyboard):
+    return [button.callback_data for row in keyboard.inline_keyboard for button in row if button.callback_data]
+
+def state_name(state):
+    return state.state if state is not None else None
+
+@pytest.fixture(autouse=True)
+def offline_popups(monkeypatch):
+    """Popup texts are only registered in the in-process cache; no flush is scheduled."""
+    monkeypatch.setattr(popup_store, "_schedule_flush", lambda: None)
+
+@pytest.fixture(scope="module")
+def router():
+    return handlers.build_callback_router()
+
+def menu_screens():
+    """(keyboard, states it is shown in, expected handler per action) for every menu outside a flow."""
+    start = handlers.start_button_callback
+    my_channels = handlers.my_channels_callback
+    return [
+        (create_start_keyboard(), [None], {}, start),
+        (create_help_keyboard(), [None], {}, start),
+        (create_default_buttons_keyboard(), [None], {"set_default_buttons": handlers.default_buttons_callback,
+                                                     "clear_default_buttons": handlers.default_buttons_callback}, start),
+        (
+            create_my_channels_keyboard(CHANNELS, prev_data="chpage:my:b:-1001", next_data="chpage:my:a:-1002", quarantined_count=1),
+            [None],
+            {"chpage": handlers.channel_page_callback, "back_to_start": start, "close_message": start},
+            my_channels
+        ),
+        (create_quarantine_keyboard(CHANNELS), [None], {"close_message": start}, my_channels)
+    ]
+
+@pytest.mark.parametrize("index", range(5))
+def test_menu_callbacks(router, index):
+    keyboard, states, overrides, default = menu_screens()[index]
+    for state in states:
+        for data in callback_data(keyboard):
+            action = data.partition(":")[0]
+            assert router.resolve(data, state) is overrides.get(action, default), (data, state)
+
+@pytest.mark.parametrize("state", [PostState.WaitingForChannel, EditState.WaitingForChannel])
+def test_channel_picker(router, state):
+    keyboard = create_channel_selection_keyboard(CHANNELS, prev_data="chpage:sel:b:-1001", next_data="chpage:sel:a:-1002", show_search=True)
+    expected = {
+        "select_channel": handlers.select_channel,
+        "chpage": handlers.channel_page_callback,
+        "cancel_action": handlers.cancel_action,
+        "close_message": handlers.close_message
+    }
+    for data in callback_data(keyboard):
+        assert router.resolve(data, state.state) is expected[data.partition(":")[0]], data
+
+@pytest.mark.parametrize("state", BACK_STATES + [PostState.WaitingForMessage, BroadcastState.WaitingForMessage])
+def test_flow_prompts(router, state):
+    keyboard = create_channel_selection_keyboard([], show_back=True, show_close=True)
+    expected = {"cancel_action": handlers.cancel_action, "back_action": handlers.back_action, "close_message": handlers.close_message}
+    for data in callback_data(keyboard):
+        assert router.resolve(data, state.state) is expected[data], data
+
+@pytest.mark.parametrize("state", list(PREVIEW_STATES))
+def test_preview_confirmation(router, state):
+    confirm = PREVIEW_STATES[state]
+    keyboards = [create_confirm_keyboard(), create_button_keyboard(BUTTONS, for_preview=True)]
+    if state is BroadcastState.WaitingForPreview:
+        keyboards.append(create_broadcast_target_keyboard(["news", "promo"], ["news"]))
+    expected = {
+        "confirm_post": confirm,
+        "cancel_action": confirm,
+        "close_message": handlers.close_message,
+        "broadcast_tag": broadcaster.toggle_broadcast_tag,
+        "pp": handlers.button_callback,
+        "pa": handlers.button_callback
+    }
+    for keyboard in keyboards:
+        for data in callback_data(keyboard):
+            assert router.resolve(data, state.state) is expected[data.partition(":")[0]], data
+
+@pytest.mark.parametrize("state,action,handler", [
+    (BroadcastEditState.WaitingForBroadcast, "select_broadcast", broadcaster.select_broadcast),
+    (RetractState.WaitingForBroadcast, "retract_broadcast", broadcaster.select_broadcast_to_retract)
+])
+def test_broadcast_picker(router, state, action, handler):
+    keyboard = create_broadcast_selection_keyboard(JOBS, action=action)
+    expected = {action: handler, "cancel_action": handlers.cancel_action, "close_message": handlers.close_message}
+    for data in callback_data(keyboard):
+        assert router.resolve(data, state.state) is expected[data.partition(":")[0]], data
+
+@pytest.mark.parametrize("state", [None, PostState.WaitingForPreview, BroadcastEditState.WaitingForContent])
+def test_published_buttons(router, state):
+    """Buttons on published posts are tapped by anyone, whatever their own FSM state."""
+    keyboard = create_button_keyboard(BUTTONS, for_preview=True)
+    for data in callback_data(keyboard) + ["popup:legacy text", "alert:legacy text"]:
+        assert router.resolve(data, state_name(state)) is handlers.button_callback, data
+
+def test_unknown_callbacks_fall_back(router):
+    assert router.resolve("no_such_action", None) is handlers.debug_callback
+    assert router.resolve("select_channel:-1001", None) is handlers.debug_callback
+
+def test_duplicate_route_is_rejected():
+    router = CallbackRouter()
+    router.add("confirm_post", handlers.handle_preview_confirmation, state=PostState.WaitingForPreview)
+    with pytest.raises(ValueError):
+        router.add("confirm_post", handlers.handle_edit_confirmation, state=PostState.WaitingForPreview)
+
+def test_current_state_wins_over_any_state():
+    router = CallbackRouter()
+    router.add("cancel_action", handlers.cancel_action, state=ANY_STATE)
+    router.add("cancel_action", handlers.handle_preview_confirmation, state=PostState.WaitingForPreview)
+    assert router.resolve("cancel_action", PostState.WaitingForPreview.state) is handlers.handle_preview_confirmation
+    assert router.resolve("cancel_action", EditState.WaitingForContent.state) is handlers.cancel_action